@@ -10,8 +10,11 @@ import creds
 from discord.ext import commands
 
 from botlog import setup_logging, add_hooks
+from cogs.reset_season import fetch_current_season
 from cogs.utils import context, category
 from cogs.utils.db import Table
+from cogs.utils.statements import registry
+from cogs.utils.supervisor import TaskSupervisor
 from cogs.utils.error_handler import error_handler, discord_event_error, clash_event_error
 
 
@@ -85,6 +88,8 @@ class DonationBot(commands.Bot):
         self.dbl_token = creds.dbl_token
         self.owner_ids = {230214242618441728, 251150854571163648}  # maths, tuba
         self.session = aiohttp.ClientSession(loop=self.loop)
+        self.supervisor = TaskSupervisor(self.loop)
+        self.supervisor.spawn('supervisor.monitor_lag', self.supervisor.monitor_lag, restart=True)
 
         add_hooks(self)
         self.before_invoke(self.before_command_invoke)
@@ -211,16 +216,26 @@ class DonationBot(commands.Bot):
 
     async def get_clans(self, guild_id, in_event=False):
         if in_event:
-            query = "SELECT DISTINCT clan_tag FROM clans WHERE guild_id = $1 AND in_event = $2"
-            fetch = await self.pool.fetch(query, guild_id, in_event)
+            fetch = await registry.fetch(self.pool, 'guild_clans_in_event', guild_id, in_event)
         else:
-            query = "SELECT DISTINCT clan_tag FROM clans WHERE guild_id = $1"
-            fetch = await self.pool.fetch(query, guild_id)
+            fetch = await registry.fetch(self.pool, 'guild_clans', guild_id)
         return await self.coc.get_clans(n[0].strip() for n in fetch).flatten()
 
     async def on_command_error(self, context, exception):
         return await error_handler(context, exception)
 
+    async def close(self):
+        # interval logs and command usages are written while the pool is still usable, before the cogs are unloaded
+        for cog in (self.donationlogs, self.trophylogs):
+            if cog:
+                await cog.spill_interval_buffers()
+        if self.background:
+            await self.background.flush_command_batch()
+
+        await super().close()
+        # anything spawned outside of a cog (log queues, the lag monitor) is stopped here
+        self.supervisor.cancel_all()
+
     async def on_error(self, event_method, *args, **kwargs):
         return await discord_event_error(self, event_method, *args, **kwargs)
 
@@ -236,9 +251,12 @@ if __name__ == '__main__':
     try:
         # configure the database connection
         pool = loop.run_until_complete(Table.create_pool(creds.postgres))
+        # every cog reads the season clock, so it's set before any of their loops or listeners can run
+        season = loop.run_until_complete(fetch_current_season(pool))
 
         bot = DonationBot()
         bot.pool = pool  # add db as attribute
+        bot.seasonconfig.set_season(season)
         setup_logging(bot)
         bot.run(creds.bot_token)  # run bot
 
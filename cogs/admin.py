@@ -17,6 +17,7 @@ from typing import Union, Optional
 
 from cogs.utils.formatters import TabularData
 from cogs.utils.converters import GlobalChannel
+from cogs.utils.statements import registry, to_columns
 
 # to expose to the eval command
 import datetime
@@ -240,6 +241,136 @@ class Admin(commands.Cog):
 
         await ctx.send(f'```\n{output}\n```')
 
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def sqlstats(self, ctx, limit=20):
+        """Shows call counts and timings for registered statements.
+        Sorted by total time spent. This is only for the current session.
+        """
+        stats = sorted(registry.stats.items(), key=lambda n: n[1].total_time, reverse=True)
+
+        table = TabularData()
+        table.set_columns(['Statement', 'Calls', 'Total (ms)', 'Avg (ms)', 'Max (ms)'])
+        table.add_rows([name, n.calls, f'{n.total_time:.2f}', f'{n.average_time:.2f}', f'{n.max_time:.2f}']
+                       for name, n in stats[:limit])
+        render = table.render()
+
+        await self.safe_send(ctx, f'```\n{render}\n```')
+
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def logqueues(self, ctx, limit=20):
+        """Shows queue depth, sent and dropped counts for log channel send queues.
+        Sorted by queue depth. This is only for the current session.
+        """
+        queues = sorted(self.bot.utils.log_queues.values(), key=lambda n: (len(n), n.dropped), reverse=True)
+
+        table = TabularData()
+        table.set_columns(['Channel', 'Queued', 'Sent', 'Dropped', 'Webhook'])
+        table.add_rows([n.channel_id, len(n), n.sent, n.dropped, bool(n.webhook_url)] for n in queues[:limit])
+        render = table.render()
+
+        await self.safe_send(ctx, f'```\n{render}\n```')
+
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def joinstats(self, ctx):
+        """Shows the new member onboarding queue and how its batches have gone this session."""
+        board = self.bot.donationboard
+        stats = board.join_stats
+        last_batch = f'{stats["last_batch"]:%H:%M:%S} UTC' if stats['last_batch'] else 'never'
+
+        await ctx.send(f'Waiting to be onboarded: {board.join_queue_depth}\n'
+                       f'Onboarded: {stats["onboarded"]}\n'
+                       f'Failed batches: {stats["failed_batches"]}\n'
+                       f'Last batch: {last_batch}')
+
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def eventupdates(self, ctx):
+        """Shows how the last event player update went."""
+        stats = self.bot.background.event_update_stats
+        if not stats:
+            return await ctx.send('The event player updater hasn\'t finished a run yet.')
+
+        await ctx.send(f'Live event players: {stats["players"]}\n'
+                       f'Changed since the last run: {stats["changed"]}\n'
+                       f'Updated: {stats["updated"]}\n'
+                       f'Took: {stats["duration"] * 1000:.0f}ms')
+
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def supervisor(self, ctx):
+        """Shows the tasks owned by the task supervisor and how far behind the event loop is running."""
+        supervisor = self.bot.supervisor
+        stats = sorted(supervisor.stats.items(), key=lambda n: (n[1].running, n[1].started), reverse=True)
+
+        table = TabularData()
+        table.set_columns(['Task', 'Running', 'Started', 'Restarts', 'Exceptions'])
+        table.add_rows([name, n.running, n.started, n.restarts, n.exceptions] for name, n in stats)
+        render = table.render()
+
+        await self.safe_send(ctx, f'```\n{render}\n```\n'
+                                  f'Event loop lag: {supervisor.lag * 1000:.2f}ms '
+                                  f'(max {supervisor.max_lag * 1000:.2f}ms)')
+
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def batchbench(self, ctx, rows: int = 1000, runs: int = 5):
+        """Benchmarks a jsonb_to_recordset batch update against an unnest batch update.
+
+        This runs against a temporary table inside a transaction that is always rolled back.
+        """
+        data = [{'player_tag': f'#BENCH{i}', 'donations': i, 'received': i, 'trophies': i} for i in range(rows)]
+        keys = ('player_tag', 'donations', 'received', 'trophies')
+
+        json_query = """UPDATE bench_players SET donations = bench_players.donations + x.donations,
+                                                 received  = bench_players.received  + x.received,
+                                                 trophies  = x.trophies
+                        FROM(
+                            SELECT x.player_tag, x.donations, x.received, x.trophies
+                            FROM jsonb_to_recordset($1::jsonb)
+                            AS x(player_tag TEXT, donations INTEGER, received INTEGER, trophies INTEGER)
+                            )
+                        AS x
+                        WHERE bench_players.player_tag = x.player_tag
+                     """
+        unnest_query = """UPDATE bench_players SET donations = bench_players.donations + x.donations,
+                                                   received  = bench_players.received  + x.received,
+                                                   trophies  = x.trophies
+                          FROM unnest($1::TEXT[], $2::INTEGER[], $3::INTEGER[], $4::INTEGER[])
+                          AS x(player_tag, donations, received, trophies)
+                          WHERE bench_players.player_tag = x.player_tag
+                       """
+
+        async with ctx.acquire():  # the temporary table and every query must share one connection
+            tr = ctx.db.transaction()
+            await tr.start()
+            try:
+                await ctx.db.execute("CREATE TEMPORARY TABLE bench_players (player_tag TEXT PRIMARY KEY, "
+                                     "donations INTEGER, received INTEGER, trophies INTEGER) ON COMMIT DROP")
+                await ctx.db.execute("INSERT INTO bench_players SELECT x, 0, 0, 0 FROM unnest($1::TEXT[]) AS x",
+                                     [n['player_tag'] for n in data])
+
+                timings = {'jsonb_to_recordset': [], 'unnest': []}
+                for _ in range(runs):
+                    start = time.perf_counter()
+                    await ctx.db.execute(json_query, data)
+                    timings['jsonb_to_recordset'].append((time.perf_counter() - start) * 1000)
+
+                    start = time.perf_counter()
+                    await ctx.db.execute(unnest_query, *to_columns(data, *keys))
+                    timings['unnest'].append((time.perf_counter() - start) * 1000)
+            finally:
+                await tr.rollback()
+
+        table = TabularData()
+        table.set_columns(['Method', 'Min (ms)', 'Avg (ms)', 'Max (ms)'])
+        table.add_rows([k, f'{min(v):.2f}', f'{sum(v) / len(v):.2f}', f'{max(v):.2f}'] for k, v in timings.items())
+        render = table.render()
+
+        await ctx.send(f'```\n{render}\n```\n*{rows} rows, {runs} runs each.*')
+
     @commands.command(pass_context=True, hidden=True, name='eval')
     async def _eval(self, ctx, *, body: str):
         """Evaluates a code"""
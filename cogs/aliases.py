@@ -186,7 +186,7 @@ class Aliases(commands.Cog, name='\u200bAliases'):
                 """
         await ctx.db.execute(query, clan.tag, ctx.guild.id, channel.id, clan.name, in_event)
 
-        season_id = await self.bot.seasonconfig.get_season_id()
+        season_id = self.bot.seasonconfig.season_id
         cog = self.bot.get_cog("Add")
         async for member in clan.get_detailed_members():
             await cog.insert_player(ctx.db, member, season_id, in_event, getattr(ctx.config, 'event_id', None))
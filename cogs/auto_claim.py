@@ -31,7 +31,7 @@ class AutoClaim(commands.Cog, name='\u200bAutoClaim'):
                     query = "UPDATE players SET user_id = $1 " \
                             "WHERE player_tag = $2 AND user_id IS NULL AND season_id = $3"
                     await self.bot.pool.execute(query, user.id, player.tag,
-                                                await self.bot.seasonconfig.get_season_id())
+                                                self.bot.seasonconfig.season_id)
                 else:
                     return False
             return user
@@ -46,7 +46,7 @@ class AutoClaim(commands.Cog, name='\u200bAutoClaim'):
             query = "SELECT user_id FROM players WHERE player_tag = $1 AND season_id = $2"
             m = clan.get_member(name=n[0])
             fetch = await self.bot.pool.fetchrow(query, m.tag,
-                                                 await self.bot.seasonconfig.get_season_id())
+                                                 self.bot.seasonconfig.season_id)
             if fetch is None:
                 continue
             del matches[i]
@@ -56,7 +56,7 @@ class AutoClaim(commands.Cog, name='\u200bAutoClaim'):
             query = "UPDATE players SET user_id = $1 WHERE player_tag = $2 " \
                     "AND user_id IS NULL AND season_id = $3"
             await self.bot.pool.execute(query, member.id, player.tag,
-                                        await self.bot.seasonconfig.get_season_id())
+                                        self.bot.seasonconfig.season_id)
             return player
         elif len(matches) == 1:
             return True
@@ -111,7 +111,7 @@ class AutoClaim(commands.Cog, name='\u200bAutoClaim'):
 
         self.running_commands[ctx.guild.id] = True
 
-        season_id = await self.bot.seasonconfig.get_season_id()
+        season_id = self.bot.seasonconfig.season_id
         failed_players = []
 
         if not clan:
@@ -254,7 +254,7 @@ class AutoClaim(commands.Cog, name='\u200bAutoClaim'):
 
         final = []
 
-        season_id = await self.bot.seasonconfig.get_season_id()
+        season_id = self.bot.seasonconfig.season_id
         query = "SELECT user_id FROM players WHERE player_tag = $1 AND season_id = $2"
         for n in players:
             fetch = await ctx.db.fetchrow(query, n.tag, season_id)
@@ -311,7 +311,7 @@ class AutoClaim(commands.Cog, name='\u200bAutoClaim'):
         :white_check_mark: `+getclaims mathsman`
         :white_check_mark: `+getclaims @mathsman`
         """
-        season_id = await self.bot.seasonconfig.get_season_id()
+        season_id = self.bot.seasonconfig.season_id
         if not player:
             player = ctx.author
 
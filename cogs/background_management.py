@@ -1,210 +1,286 @@
 import asyncio
+import asyncpg
+import coc
 import datetime
 import discord
+import heapq
 import logging
-import textwrap
 import time
 
+from collections import Counter
 from discord.ext import commands, tasks
+from functools import partial
 
 from cogs.utils.db_objects import SlimEventConfig
 from cogs.utils.formatters import readable_time
 from cogs.utils.emoji_lookup import misc
+from cogs.utils.statements import (registry, to_columns, COMMAND_COLUMNS, EVENT_PLAYER_COLUMNS, SEASON_START_COLUMNS,
+                                   SEASON_FINAL_COLUMNS)
 
 log = logging.getLogger(__name__)
 
+EVENT_UPDATE_CHUNK_SIZE = 500
+REQUESTS_PER_KEY = 5
+EVENT_TRANSITION_CONCURRENCY = 10
+EVENT_TRANSITION_RETRY = datetime.timedelta(minutes=5)
+# command usages kept for a retry while the database is down, the oldest are dropped past this
+MAX_COMMAND_BATCH = 10000
+
 
 class BackgroundManagement(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.next_event_starts.start()
+        self._event_player_roster = {}
+        self.event_update_stats = {}
         self.event_player_updater.start()
 
+        self._command_batch = []
+        self._command_digest = Counter()
+        self._command_digest_failed = Counter()
+        self.command_batch_loop.add_exception_type(asyncpg.PostgresConnectionError)
+        self.command_batch_loop.start()
+        self.command_digest_loop.add_exception_type(discord.HTTPException)
+        self.command_digest_loop.start()
+
+        # clan_tag: {event_id}, player_tag: {event_id: start_best_trophies}, for events in progress
+        self.active_events = {}
+        self.event_clans = {}
+        self.event_players = {}
+
+        self._event_heap = []
+        self._running_transitions = set()
+        self._scheduler_wakeup = asyncio.Event(loop=bot.loop)
+        self._transition_semaphore = asyncio.Semaphore(EVENT_TRANSITION_CONCURRENCY, loop=bot.loop)
+        self.bot.supervisor.spawn('background.event_scheduler', self.run_event_scheduler, owner=self, restart=True)
+
     def cog_unload(self):
-        self.next_event_starts.cancel()
         self.event_player_updater.cancel()
+        self.command_batch_loop.cancel()
+        self.command_digest_loop.cancel()
+        self.bot.supervisor.cancel_owner(self)
+        if self._command_batch:
+            # only on a reload, `DonationBot.close` flushes it on shutdown while the pool is still open.
+            # not owned by the cog so it isn't cancelled with the rest of its tasks
+            self.bot.supervisor.spawn('background.flush_command_batch', self.flush_command_batch)
 
     @commands.command(hidden=True)
     @commands.is_owner()
     async def forceguild(self, ctx, guild_id: int):
         self.bot.dispatch('guild_join', self.bot.get_guild(guild_id))
 
-    @tasks.loop()
-    async def next_event_starts(self):
-        await self.bot.wait_until_ready()
+    async def load_event_transitions(self):
         query = """SELECT id,
                           start,
                           finish,
                           event_name,
                           guild_id,
                           channel_id,
-                          start - CURRENT_TIMESTAMP AS "until_start"
+                          start_report,
+                          finish_report
                    FROM events
                    WHERE start_report = False
-                   ORDER BY "until_start" 
-                   LIMIT 1;
+                   OR (start_report = True AND finish_report = False)
                 """
-        event = await self.bot.pool.fetchrow(query)
-        if not event:
-            return await asyncio.sleep(3600)
+        fetch = await self.bot.pool.fetch(query)
+        now = datetime.datetime.utcnow()
+
+        heap = []
+        for n in fetch:
+            event = SlimEventConfig(n['id'], n['start'], n['finish'], n['event_name'], n['channel_id'], n['guild_id'])
+            if not n['start_report'] and n['finish'] > now and (event.id, 'start') not in self._running_transitions:
+                heap.append((event.start, 0, event.id, 'start', event))
+            # an event only finishes once it has started, so old events that were never started aren't reported
+            if n['start_report'] and not n['finish_report'] and (event.id, 'finish') not in self._running_transitions:
+                heap.append((event.finish, 1, event.id, 'finish', event))
+
+        heapq.heapify(heap)
+        self._event_heap = heap
+        self._scheduler_wakeup.set()
+        log.info(f'Loaded {len(heap)} pending event transitions.')
+
+    async def load_active_events(self):
+        query = """SELECT id, start, finish, event_name, guild_id, channel_id
+                   FROM events
+                   WHERE start <= now()
+                   AND finish >= now()
+                """
+        fetch = await self.bot.pool.fetch(query)
+        active_events = {n['id']: SlimEventConfig(n['id'], n['start'], n['finish'], n['event_name'],
+                                                  n['channel_id'], n['guild_id']) for n in fetch}
 
-        slim_config = SlimEventConfig(
-            event['id'], event['start'], event['finish'], event['event_name'], event['channel_id'], event['guild_id']
-        )
+        query = "SELECT DISTINCT clan_tag, guild_id FROM clans WHERE guild_id = ANY($1::BIGINT[]) AND in_event = True"
+        fetch = await self.bot.pool.fetch(query, list(set(n.guild_id for n in active_events.values())))
+        event_clans = {}
+        for n in fetch:
+            event_ids = (event.id for event in active_events.values() if event.guild_id == n['guild_id'])
+            event_clans.setdefault(n['clan_tag'], set()).update(event_ids)
 
-        if event['until_start'].total_seconds() < 0:
-            await self.on_event_start(slim_config)
+        query = "SELECT player_tag, event_id, start_best_trophies FROM eventplayers WHERE event_id = ANY($1::INTEGER[])"
+        fetch = await self.bot.pool.fetch(query, list(active_events.keys()))
+        event_players = {}
+        for n in fetch:
+            event_players.setdefault(n['player_tag'], {})[n['event_id']] = n['start_best_trophies']
 
-        await asyncio.sleep(event['until_start'].total_seconds())
-        await self.on_event_start(slim_config)
+        self.active_events, self.event_clans, self.event_players = active_events, event_clans, event_players
+        log.info(f'Indexed {len(active_events)} active events, {len(event_clans)} clans '
+                 f'and {len(event_players)} players.')
 
-        query = "UPDATE events SET start_report = True WHERE id = $1"
-        await self.bot.pool.execute(query, event['id'])
+    def get_clan_events(self, clan_tag):
+        return [self.active_events[n] for n in self.event_clans.get(clan_tag, ()) if n in self.active_events]
 
-    @tasks.loop()
-    async def next_event_finish(self):
+    def add_event_player(self, player_tag, event_id, start_best_trophies):
+        self.event_players.setdefault(player_tag, {}).setdefault(event_id, start_best_trophies)
+
+    async def run_event_scheduler(self):
         await self.bot.wait_until_ready()
-        query = """SELECT id,
-                          start,
-                          finish,
-                          event_name,
-                          guild_id,
-                          channel_id,
-                          finish - CURRENT_TIMESTAMP AS "until_finish"
-                   FROM events
-                   ORDER BY "until_finish"
-                   LIMIT 1;
-                """
-        event = await self.bot.pool.fetchrow(query)
-        if not event:
-            return await asyncio.sleep(3600)
+        await self.load_active_events()
+        await self.load_event_transitions()
 
-        slim_config = SlimEventConfig(
-            event['id'], event['start'], event['finish'], event['event_name'], event['channel_id'], event['guild_id']
-        )
-        self.bot.utils.board_config.invalidate(self.bot.utils, slim_config.channel_id)
+        while True:
+            self._scheduler_wakeup.clear()
 
-        if event['until_start'].total_seconds() < 0:
-            await self.on_event_finish(slim_config)
+            now = datetime.datetime.utcnow()
+            due = {}
+            while self._event_heap and self._event_heap[0][0] <= now:
+                *_, event_id, kind, event = heapq.heappop(self._event_heap)
+                self._running_transitions.add((event_id, kind))
+                due.setdefault(event_id, []).append((kind, event))
 
-        await asyncio.sleep(event['until_finish'].total_seconds())
-        await self.on_event_finish(slim_config)
+            for event_id, transitions in due.items():
+                self.bot.supervisor.spawn('background.event_transitions',
+                                          partial(self.run_event_transitions, transitions), owner=self)
+
+            timeout = (self._event_heap[0][0] - now).total_seconds() if self._event_heap else None
+            try:
+                # sleep until the next transition is due, or the heap is reloaded
+                await asyncio.wait_for(self._scheduler_wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run_event_transitions(self, transitions):
+        # an event's start and finish run in order, different events run alongside each other.
+        async with self._transition_semaphore:
+            try:
+                for i, (kind, event) in enumerate(transitions):
+                    try:
+                        await self.run_event_transition(kind, event)
+                    except Exception:
+                        retry_at = datetime.datetime.utcnow() + EVENT_TRANSITION_RETRY
+                        for kind, event in transitions[i:]:
+                            heapq.heappush(self._event_heap,
+                                           (retry_at, 0 if kind == 'start' else 1, event.id, kind, event))
+                        self._scheduler_wakeup.set()
+                        raise
+            finally:
+                for kind, event in transitions:
+                    self._running_transitions.discard((event.id, kind))
+
+    async def run_event_transition(self, kind, event):
+        if kind == 'start':
+            await self.on_event_start(event)
+            query = "UPDATE events SET start_report = True WHERE id = $1"
+        else:
+            self.bot.utils.board_config.invalidate(self.bot.utils, event.channel_id)
+            await self.on_event_finish(event)
+            query = "UPDATE events SET finish_report = True WHERE id = $1"
+        await self.bot.pool.execute(query, event.id)
+        await self.load_active_events()
+
+        if kind == 'start' and not any(n[2] == event.id and n[3] == 'finish' for n in self._event_heap):
+            heapq.heappush(self._event_heap, (event.finish, 1, event.id, 'finish', event))
+            self._scheduler_wakeup.set()
 
     @tasks.loop(hours=1)
     async def event_player_updater(self):
         query = "SELECT DISTINCT player_tag FROM eventplayers WHERE live = True;"
         fetch = await self.bot.pool.fetch(query)
 
-        query = """UPDATE eventplayers
-                   SET donations             = x.end_fin + x.end_sic - eventplayers.start_friend_in_need - eventplayers.start_sharing_is_caring,
-                       trophies              = x.trophies,
-                       end_friend_in_need    = x.end_fin,
-                       end_sharing_is_caring = x.end_sic,
-                       end_attacks           = x.end_attacks,
-                       end_defenses          = x.end_defenses,
-                       end_best_trophies     = x.end_best_trophies
-                   FROM (
-                       SELECT x.player_tag,
-                              x.trophies,
-                              x.end_fin,
-                              x.end_sic,
-                              x.end_attacks,
-                              x.end_defenses,
-                              x.end_best_trophies
-                       FROM jsonb_to_recordset($1::jsonb)
-                       AS x (
-                           player_tag TEXT,
-                           trophies INTEGER,
-                           end_fin INTEGER,
-                           end_sic INTEGER,
-                           end_attacks INTEGER,
-                           end_defenses INTEGER,
-                           end_best_trophies INTEGER
-                           )
-                        )
-                   AS x
-                   WHERE eventplayers.player_tag = x.player_tag
-                   AND eventplayers.live = True
-                """
+        query = "SELECT DISTINCT clan_tag FROM clans WHERE in_event = True;"
+        clan_tags = [n[0] for n in await self.bot.pool.fetch(query)]
 
-        to_insert = []
+        # the clan rosters are a handful of requests, so use them to find who has actually played since last time.
+        roster = {}
+        async for clan in self.bot.coc.get_clans(clan_tags):
+            for member in clan.members:
+                roster[member.tag] = (member.trophies, member.donations, member.received)
 
-        log.info(f'Starting loop for event updates. {len(fetch)} players to update!')
+        tags = []
+        for n in fetch:
+            stats = roster.get(n[0])
+            if stats is None or self._event_player_roster.get(n[0]) != stats:
+                tags.append(n[0])
+
+        log.info(f'Starting loop for event updates. {len(tags)} of {len(fetch)} players have changed.')
         start = time.perf_counter()
-        async for player in self.bot.coc.get_players((n[0] for n in fetch), update_cache=False):
-            to_insert.append(
-                {
-                    'player_tag': player.tag,
-                    'trophies': player.trophies,
-                    'end_fin': player.achievements_dict['Friend in Need'].value,
-                    'end_sic': player.achievements_dict['Sharing is caring'].value,
-                    'end_attacks': player.attack_wins,
-                    'end_defenses': player.defense_wins,
-                    'end_best_trophies': player.best_trophies
-                }
-            )
-            await asyncio.sleep(0.01)
-        await self.bot.pool.execute(query, to_insert)
-        log.info(f'Loop for event updates finished. Took {(time.perf_counter() - start)*1000}ms')
 
-    @commands.Cog.listener()
-    async def on_event_register(self):
-        self.next_event_starts.restart()
-        self.next_event_finish.restart()
+        updated = 0
+        for i in range(0, len(tags), EVENT_UPDATE_CHUNK_SIZE):
+            chunk = tags[i:i + EVENT_UPDATE_CHUNK_SIZE]
+
+            to_insert = []
+            for player in await self.fetch_players(chunk):
+                to_insert.append(
+                    {
+                        'player_tag': player.tag,
+                        'trophies': player.trophies,
+                        'end_fin': player.achievements_dict['Friend in Need'].value,
+                        'end_sic': player.achievements_dict['Sharing is caring'].value,
+                        'end_attacks': player.attack_wins,
+                        'end_defenses': player.defense_wins,
+                        'end_best_trophies': player.best_trophies
+                    }
+                )
+
+            await registry.execute(self.bot.pool, 'event_players_update',
+                                   *to_columns(to_insert, *EVENT_PLAYER_COLUMNS))
+            for player in to_insert:
+                tag = player['player_tag']
+                if tag in roster:
+                    self._event_player_roster[tag] = roster[tag]
+
+            updated += len(to_insert)
+            log.info(f'Event updates: {min(i + len(chunk), len(tags))}/{len(tags)} players fetched, '
+                     f'{updated} written.')
+
+        duration = time.perf_counter() - start
+        self.event_update_stats = {
+            'players': len(fetch),
+            'changed': len(tags),
+            'updated': updated,
+            'duration': duration
+        }
+        log.info(f'Loop for event updates finished. {len(tags)}/{len(fetch)} players changed, '
+                 f'{updated} updated. Took {duration*1000:.0f}ms')
+
+    async def fetch_player(self, semaphore, tag):
+        async with semaphore:
+            try:
+                return await self.bot.coc.get_player(tag, update_cache=False)
+            except coc.NotFound:
+                return None
 
-    @staticmethod
-    async def insert_member(con, player, event_id):
-        query = """INSERT INTO eventplayers (
-                                    player_tag,
-                                    trophies,
-                                    event_id,
-                                    start_friend_in_need,
-                                    start_sharing_is_caring,
-                                    start_attacks,
-                                    start_defenses,
-                                    start_trophies,
-                                    start_best_trophies,
-                                    start_update,
-                                    live
-                                    )
-                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, True, True)
-                    ON CONFLICT (player_tag, event_id)
-                    DO NOTHING;
-                """
-        await con.execute(query,
-                          player.tag,
-                          player.trophies,
-                          event_id,
-                          player.achievements_dict['Friend in Need'].value,
-                          player.achievements_dict['Sharing is caring'].value,
-                          player.attack_wins,
-                          player.defense_wins,
-                          player.trophies,
-                          player.best_trophies
-                          )
+    async def fetch_players(self, tags):
+        # spread over every API key we have, without queueing hundreds of requests at once.
+        semaphore = asyncio.Semaphore(self.bot.coc.key_count * REQUESTS_PER_KEY)
+        players = await asyncio.gather(*(self.fetch_player(semaphore, tag) for tag in tags))
+        return [n for n in players if n]
 
     @staticmethod
-    async def finalise_member(con, player, event_id):
-        query = """UPDATE eventplayers 
-                   SET end_friend_in_need = $1,
-                       end_sharing_is_caring = $2,
-                       end_attacks = $3,
-                       end_defenses = $4,
-                       end_best_trophies = $5,
-                       live = False,
-                       final_update = True
-                   WHERE player_tag = $6
-                   AND event_id = $7
-                """
-        await con.execute(query,
-                          player.achievements_dict['Friend in Need'].value,
-                          player.achievements_dict['Sharing is caring'].value,
-                          player.attack_wins,
-                          player.defense_wins,
-                          player.best_trophies,
-                          player.tag,
-                          event_id
-                          )
+    def player_stats(player):
+        return {
+            'player_tag': player.tag,
+            'friend_in_need': player.achievements_dict['Friend in Need'].value,
+            'sharing_is_caring': player.achievements_dict['Sharing is caring'].value,
+            'attacks': player.attack_wins,
+            'defenses': player.defense_wins,
+            'trophies': player.trophies,
+            'best_trophies': player.best_trophies
+        }
+
+    @commands.Cog.listener()
+    async def on_event_register(self):
+        await self.load_active_events()
+        await self.load_event_transitions()
 
     @staticmethod
     async def safe_send(channel, msg):
@@ -219,11 +295,14 @@ class BackgroundManagement(commands.Cog):
         channel = self.bot.get_channel(event.channel_id)
         await self.safe_send(channel, ':tada: Event starting! I am adding members to the database...')
 
-        clans = await self.bot.get_clans(event.guild_id, in_event=True)
+        fetch = await registry.fetch(self.bot.pool, 'guild_clans_in_event', event.guild_id, True)
+        clans = await asyncio.gather(*(self.bot.coc.get_clan(n[0].strip()) for n in fetch))
 
-        for n in clans:
-            async for player in n.get_detailed_members():
-                await self.insert_member(self.bot.pool, player, event.id)
+        tags = list(set(member.tag for clan in clans for member in clan.members))
+        players = await self.fetch_players(tags)
+        await registry.execute(self.bot.pool, 'event_players_enroll',
+                               *to_columns([self.player_stats(n) for n in players], *SEASON_START_COLUMNS), event.id)
+        log.info(f'Enrolled {len(players)} players from {len(clans)} clans for event {event.id}.')
         await self.safe_send(channel, 'All members have been added... '
                                       'configuring the donation and trophy boards to be in the event!')
         query = "UPDATE boards SET in_event = True WHERE guild_id = $1"
@@ -289,16 +368,34 @@ class BackgroundManagement(commands.Cog):
         query = f"UPDATE events SET {board_type}_msg = $1 WHERE id = $2"
         await self.bot.pool.execute(query, msg.id, event.id)
 
+    async def finalise_members(self, event):
+        # only unfinalised players are selected, so an interrupted finish picks up where it stopped when run again.
+        query = "SELECT player_tag FROM eventplayers WHERE event_id=$1 AND final_update=False"
+        tags = [n[0] for n in await self.bot.pool.fetch(query, event.id)]
+
+        finalised = 0
+        for i in range(0, len(tags), EVENT_UPDATE_CHUNK_SIZE):
+            chunk = tags[i:i + EVENT_UPDATE_CHUNK_SIZE]
+            players = await self.fetch_players(chunk)
+            found = {n.tag for n in players}
+            missing = [n for n in chunk if n not in found]
+
+            async with self.bot.pool.acquire() as con:
+                async with con.transaction():
+                    await registry.execute(con, 'event_players_finalise',
+                                           *to_columns([self.player_stats(n) for n in players], *SEASON_FINAL_COLUMNS),
+                                           event.id)
+                    if missing:
+                        await registry.execute(con, 'event_players_finalise_missing', missing, event.id)
+            finalised += len(chunk)
+            log.info(f'Finalised {finalised}/{len(tags)} players for event {event.id}.')
+
     async def on_event_finish(self, event):
         channel = self.bot.get_channel(event.channel_id)
         await self.safe_send(channel, ':tada: Aaaand thats it! The event has finished. I am crunching the numbers, '
                                       'working out who the champs and chumps are, and will get back to you shortly.')
 
-        query = "SELECT player_tag FROM eventplayers WHERE event_id=$1 AND final_update=False"
-        fetch = await self.bot.pool.fetch(query, event.id)
-
-        async for player in self.bot.coc.get_players((n[0] for n in fetch)):
-            await self.finalise_member(self.bot.pool, player, event.id)
+        await self.finalise_members(event)
 
         await self.safe_send(channel, 'All members have been finalised, updating your boards!')
         query = "UPDATE boards SET in_event = False WHERE guild_id = $1;"
@@ -333,21 +430,16 @@ class BackgroundManagement(commands.Cog):
         if new_league.id == 29000000:
             return  # unranked - probably start of season.
 
-        query = """SELECT channel_id 
-                   FROM events
-                   INNER JOIN eventplayers 
-                   ON eventplayers.event_id = events.id
-                   WHERE start_best_trophies < $1 
-                   AND player_tag = $2
-                """
-        fetch = await self.bot.pool.fetch(query, player.trophies, player.tag)
-        if not fetch:
+        events = [self.active_events[event_id]
+                  for event_id, start_best_trophies in self.event_players.get(player.tag, {}).items()
+                  if event_id in self.active_events and start_best_trophies < player.trophies]
+        if not events:
             return
 
         msg = f"Breaking new heights! {player} just got promoted to {new_league} league!"
 
-        for record in fetch:
-            await self.safe_send(self.bot.get_channel(record['channel_id']), msg)
+        for event in events:
+            await self.safe_send(self.bot.get_channel(event.channel_id), msg)
 
     @commands.Cog.listener()
     async def on_guild_join(self, guild):
@@ -390,52 +482,97 @@ class BackgroundManagement(commands.Cog):
 
     @commands.Cog.listener()
     async def on_command(self, ctx):
+        self.bot.command_stats[ctx.command.qualified_name] += 1
+        ctx.command_started = time.perf_counter()
+
+    @commands.Cog.listener()
+    async def on_command_completion(self, ctx):
+        self.add_command_usage(ctx, failed=False)
+
+    @commands.Cog.listener()
+    async def on_command_error(self, ctx, error):
+        if hasattr(ctx, 'command_started'):
+            self.add_command_usage(ctx, failed=True)
+
+    def add_command_usage(self, ctx, failed):
         command = ctx.command.qualified_name
-        self.bot.command_stats[command] += 1
-        message = ctx.message
-        if ctx.guild is None:
-            guild_id = None
-        else:
-            guild_id = ctx.guild.id
+        self._command_batch.append({
+            'guild_id': ctx.guild and ctx.guild.id,
+            'channel_id': ctx.channel.id,
+            'author_id': ctx.author.id,
+            'used': ctx.message.created_at,
+            'prefix': ctx.prefix,
+            'command': command,
+            'failed': failed,
+            'latency': (time.perf_counter() - ctx.command_started) * 1000
+        })
+
+        if ctx.author.id not in self.bot.owner_ids:
+            self._command_digest[command] += 1
+            if failed:
+                self._command_digest_failed[command] += 1
+
+    @tasks.loop(seconds=10.0)
+    async def command_batch_loop(self):
+        await self.flush_command_batch()
+
+    async def flush_command_batch(self):
+        if not self._command_batch:
+            return
 
-        query = """INSERT INTO commands (guild_id, channel_id, author_id, used, prefix, command)
-                               VALUES ($1, $2, $3, $4, $5, $6)
-                """
+        batch, self._command_batch = self._command_batch, []
+        try:
+            await registry.execute(self.bot.pool, 'commands_insert', *to_columns(batch, *COMMAND_COLUMNS))
+        except (asyncpg.PostgresError, asyncpg.InterfaceError, OSError):
+            # put the batch back in front of anything added since, it's retried on the next loop
+            self._command_batch[:0] = batch
+            dropped = len(self._command_batch) - MAX_COMMAND_BATCH
+            if dropped > 0:
+                del self._command_batch[:dropped]
+                log.warning(f'Dropped {dropped} command usages, the batch is full.')
+            log.exception(f'Failed to register {len(batch)} command usages to the database.')
+            return
 
-        e = discord.Embed(title='Command', colour=discord.Colour.green())
-        e.add_field(name='Name', value=ctx.command.qualified_name)
-        e.add_field(name='Author', value=f'{ctx.author} (ID: {ctx.author.id})')
+        log.debug(f'Registered {len(batch)} command usages to the database.')
 
-        fmt = f'Channel: {ctx.channel} (ID: {ctx.channel.id})'
-        if ctx.guild:
-            fmt = f'{fmt}\nGuild: {ctx.guild} (ID: {ctx.guild.id})'
+    @tasks.loop(minutes=10.0)
+    async def command_digest_loop(self):
+        if not self._command_digest:
+            return
 
-        e.add_field(name='Location', value=fmt, inline=False)
-        e.add_field(name='Content', value=textwrap.shorten(ctx.message.content, width=512))
+        digest, self._command_digest = self._command_digest, Counter()
+        failed, self._command_digest_failed = self._command_digest_failed, Counter()
 
+        e = discord.Embed(title='Commands', colour=discord.Colour.green())
+        e.description = '\n'.join(f'`{command}`: {count}' + (f' ({failed[command]} failed)' if failed[command] else '')
+                                   for command, count in digest.most_common(25))
+        e.set_footer(text=f'{sum(digest.values())} commands in the last {self.command_digest_loop.minutes:g} minutes')
         e.timestamp = datetime.datetime.utcnow()
-        if not await self.bot.is_owner(ctx.author):
-            await self.bot.command_webhook.send(embed=e)
-
-        await self.bot.pool.execute(query, guild_id, ctx.channel.id, ctx.author.id,
-                                    message.created_at, ctx.prefix, command
-                                    )
+        await self.bot.command_webhook.send(embed=e)
 
     @commands.Cog.listener()
     async def on_clan_claim(self, ctx, clan):
         e = discord.Embed(colour=discord.Colour.blue(), title='Clan Claimed')
         await self.send_claim_clan_stats(e, clan, ctx.guild)
         await self.bot.utils.update_clan_tags()
-        await self.bot.donationlogs.sync_temp_event_tasks()
-        await self.bot.trophylogs.sync_temp_event_tasks()
+        await self.bot.utils.sync_clan_names()
+        await self.load_active_events()
+        await self.bot.donationlogs.sync_clan_channels()
+        await self.bot.donationlogs.sync_interval_channels()
+        await self.bot.trophylogs.sync_clan_channels()
+        await self.bot.trophylogs.sync_interval_channels()
 
     @commands.Cog.listener()
     async def on_clan_unclaim(self, ctx, clan):
         e = discord.Embed(colour=discord.Colour.dark_blue(), title='Clan Unclaimed')
         await self.send_claim_clan_stats(e, clan, ctx.guild)
         await self.bot.utils.update_clan_tags()
-        await self.bot.donationlogs.sync_temp_event_tasks()
-        await self.bot.trophylogs.sync_temp_event_tasks()
+        await self.bot.utils.sync_clan_names()
+        await self.load_active_events()
+        await self.bot.donationlogs.sync_clan_channels()
+        await self.bot.donationlogs.sync_interval_channels()
+        await self.bot.trophylogs.sync_clan_channels()
+        await self.bot.trophylogs.sync_interval_channels()
 
     async def send_guild_stats(self, e, guild):
         e.add_field(name='Name', value=guild.name)
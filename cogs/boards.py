@@ -11,6 +11,10 @@ from discord.ext import commands, tasks
 
 from cogs.utils.db_objects import DatabaseMessage
 from cogs.utils.formatters import CLYTable, get_render_type
+from cogs.utils.statements import (
+    registry, to_columns, top_players_statement, FLUSH_COLUMNS, DONATION_EVENT_COLUMNS, TROPHY_EVENT_COLUMNS,
+    JOIN_PLAYER_COLUMNS, EVENT_JOIN_COLUMNS
+)
 from cogs.utils import checks
 
 
@@ -51,10 +55,16 @@ class DonationBoard(commands.Cog):
         self.update_global_board.add_exception_type(asyncpg.PostgresConnectionError, coc.ClashOfClansException)
         self.update_global_board.start()
 
+        self._join_queue = {}
+        self.join_stats = {'onboarded': 0, 'failed_batches': 0, 'last_batch': None}
+        self.join_batch_loop.add_exception_type(asyncpg.PostgresConnectionError, coc.ClashOfClansException)
+        self.join_batch_loop.start()
+
     def cog_unload(self):
         self.bulk_insert_loop.cancel()
         self.update_board_loops.cancel()
         self.update_global_board.cancel()
+        self.join_batch_loop.cancel()
         self.bot.coc.remove_events(
             self.on_clan_member_donation,
             self.on_clan_member_received,
@@ -73,13 +83,7 @@ class DonationBoard(commands.Cog):
             clan_tags = list(self._clan_events)
             self._clan_events.clear()
 
-        query = """SELECT DISTINCT boards.channel_id
-                    FROM boards
-                    INNER JOIN clans
-                    ON clans.channel_id = boards.channel_id
-                    WHERE clans.clan_tag = ANY($1::TEXT[])
-                """
-        fetch = await self.bot.pool.fetch(query, clan_tags)
+        fetch = await registry.fetch(self.bot.pool, 'board_channels_for_clans', clan_tags)
 
         for n in fetch:
             try:
@@ -89,13 +93,8 @@ class DonationBoard(commands.Cog):
 
     @tasks.loop(hours=1)
     async def update_global_board(self):
-        query = """SELECT player_tag, donations
-                   FROM players 
-                   WHERE season_id=$1
-                   ORDER BY donations DESC NULLS LAST
-                   LIMIT 100;
-                """
-        fetch_top_players = await self.bot.pool.fetch(query, await self.bot.seasonconfig.get_season_id())
+        fetch_top_players = await registry.fetch(self.bot.pool, 'global_top_players',
+                                                 self.bot.seasonconfig.season_id)
 
         players = await self.bot.coc.get_players((n[0] for n in fetch_top_players)).flatten()
 
@@ -121,45 +120,31 @@ class DonationBoard(commands.Cog):
             await v.edit(embed=e, content=None)
 
     async def bulk_insert(self):
-        query = """UPDATE players SET donations = players.donations + x.donations, 
-                                      received  = players.received  + x.received, 
-                                      trophies  = x.trophies
-                        FROM(
-                            SELECT x.player_tag, x.donations, x.received, x.trophies
-                                FROM jsonb_to_recordset($1::jsonb)
-                            AS x(player_tag TEXT, 
-                                 donations INTEGER, 
-                                 received INTEGER, 
-                                 trophies INTEGER)
-                            )
-                    AS x
-                    WHERE players.player_tag = x.player_tag
-                    AND players.season_id=$2
-                """
-
-        query2 = """UPDATE eventplayers SET donations = eventplayers.donations + x.donations, 
-                                            received  = eventplayers.received  + x.received,
-                                            trophies  = x.trophies   
-                        FROM(
-                            SELECT x.player_tag, x.donations, x.received, x.trophies
-                            FROM jsonb_to_recordset($1::jsonb)
-                            AS x(player_tag TEXT, 
-                                 donations INTEGER, 
-                                 received INTEGER, 
-                                 trophies INTEGER)
-                            )
-                    AS x
-                    WHERE eventplayers.player_tag = x.player_tag
-                    AND eventplayers.live = true                    
-                """
-        if self._data_batch:
-            response = await self.bot.pool.execute(query, list(self._data_batch.values()),
-                                                   await self.bot.seasonconfig.get_season_id())
-            log.debug(f'Registered donations/received to the database. Status Code {response}.')
-
-            response = await self.bot.pool.execute(query2, list(self._data_batch.values()))
-            log.debug(f'Registered donations/received to the events database. Status Code {response}.')
-            self._data_batch.clear()
+        # the donation and trophy log events collected this tick are committed in the same statement,
+        # so either everything from this tick is written or nothing is.
+        donationlogs, trophylogs = self.bot.donationlogs, self.bot.trophylogs
+        donation_events = donationlogs.get_batch() if donationlogs else []
+        trophy_events = trophylogs.get_batch() if trophylogs else []
+
+        if not (self._data_batch or donation_events or trophy_events):
+            return
+
+        fetch = await registry.fetchrow(
+            self.bot.pool,
+            'tick_flush',
+            *to_columns(self._data_batch.values(), *FLUSH_COLUMNS),
+            self.bot.seasonconfig.season_id,
+            *to_columns(donation_events, *DONATION_EVENT_COLUMNS),
+            *to_columns(trophy_events, *TROPHY_EVENT_COLUMNS)
+        )
+        log.debug(f"Flushed {fetch['players']} players, {fetch['eventplayers']} event players, "
+                  f"{fetch['donationevents']} donation events and {fetch['trophyevents']} trophy events.")
+
+        self._data_batch.clear()
+        if donationlogs:
+            donationlogs.clear_batch(len(donation_events))
+        if trophylogs:
+            trophylogs.clear_batch(len(trophy_events))
 
     @commands.Cog.listener()
     async def on_guild_channel_delete(self, channel):
@@ -214,6 +199,30 @@ class DonationBoard(commands.Cog):
             if message:
                 await self.new_board_message(self.bot.get_channel(payload.channel_id), config.type)
 
+    def add_player_delta(self, player, clan, donations=0, received=0, trophies=None):
+        """Accumulate a player's changes since the last flush into a single batch row.
+
+        Donations and received are summed and trophies keep the latest value seen.
+        This must be called with the batch lock held.
+        """
+        trophies = player.trophies if trophies is None else trophies
+
+        try:
+            row = self._data_batch[player.tag]
+        except KeyError:
+            self._data_batch[player.tag] = {
+                'player_tag': player.tag,
+                'donations': donations,
+                'received': received,
+                'trophies': trophies
+            }
+        else:
+            row['donations'] += donations
+            row['received'] += received
+            row['trophies'] = trophies
+
+        self._clan_events.add(clan.tag)
+
     async def on_clan_member_donation(self, old_donations, new_donations, player, clan):
         log.debug(f'Received on_clan_member_donation event for player {player} of clan {clan}')
         if old_donations > new_donations:
@@ -222,16 +231,7 @@ class DonationBoard(commands.Cog):
             donations = new_donations - old_donations
 
         async with self._batch_lock:
-            try:
-                self._data_batch[player.tag]['donations'] = donations
-            except KeyError:
-                self._data_batch[player.tag] = {
-                    'player_tag': player.tag,
-                    'donations': donations,
-                    'received': 0,
-                    'trophies': player.trophies
-                }
-            self._clan_events.add(clan.tag)
+            self.add_player_delta(player, clan, donations=donations)
 
     async def on_clan_member_received(self, old_received, new_received, player, clan):
         log.debug(f'Received on_clan_member_received event for player {player} of clan {clan}')
@@ -241,118 +241,64 @@ class DonationBoard(commands.Cog):
             received = new_received - old_received
 
         async with self._batch_lock:
-            try:
-                self._data_batch[player.tag]['received'] = received
-            except KeyError:
-                self._data_batch[player.tag] = {
-                    'player_tag': player.tag,
-                    'donations': 0,
-                    'received': received,
-                    'trophies': player.trophies
-                }
-            self._clan_events.add(clan.tag)
+            self.add_player_delta(player, clan, received=received)
 
     async def on_clan_member_trophies_change(self, _, new_trophies, player, clan):
         log.debug(f'Received on_clan_member_trophy_change event for player {player} of clan {clan}.')
 
         async with self._batch_lock:
-            try:
-                self._data_batch[player.tag]['trophies'] = new_trophies
-            except KeyError:
-                self._data_batch[player.tag] = {
-                    'player_tag': player.tag,
-                    'donations': 0,
-                    'received': 0,
-                    'trophies': new_trophies
-                }
-            self._clan_events.add(clan.tag)
+            self.add_player_delta(player, clan, trophies=new_trophies)
 
     async def on_clan_member_join(self, member, clan):
-        player = await self.bot.coc.get_player(member.tag)
-        player_query = """INSERT INTO players (
-                                        player_tag, 
-                                        donations, 
-                                        received, 
-                                        trophies, 
-                                        start_trophies, 
-                                        season_id,
-                                        start_friend_in_need,
-                                        start_sharing_is_caring,
-                                        start_attacks,
-                                        start_defenses,
-                                        start_best_trophies,
-                                        start_update
-                                        ) 
-                    VALUES ($1,$2,$3,$4,$4,$5,$6,$7,$8,$9,$10,True) 
-                    ON CONFLICT (player_tag, season_id) 
-                    DO NOTHING
-                """
-
-        response = await self.bot.pool.execute(
-            player_query,
-            player.tag,
-            player.donations,
-            player.received,
-            player.trophies,
-            await self.bot.seasonconfig.get_season_id(),
-            player.achievements_dict['Friend in Need'].value,
-            player.achievements_dict['Sharing is caring'].value,
-            player.attack_wins,
-            player.defense_wins,
-            player.best_trophies
-        )
-        log.debug(f'New member {member} joined clan {clan}. Performed a query to insert them into players. '
-                  f'Status Code: {response}')
-
-        query = """SELECT events.id 
-                   FROM events 
-                   INNER JOIN clans 
-                   ON clans.guild_id = events.guild_id 
-                   WHERE clans.clan_tag = $1
-                   AND events.start <= now()
-                   AND events.finish >= now()
-                """
-        fetch = await self.bot.pool.fetch(query, clan.tag)
-        if not fetch:
+        # joins come in bursts (season start, war clan rotations), so they're onboarded in batches.
+        self._join_queue[member.tag] = clan.tag
+
+    @property
+    def join_queue_depth(self):
+        return len(self._join_queue)
+
+    @tasks.loop(seconds=30.0)
+    async def join_batch_loop(self):
+        if not self._join_queue:
+            return
+
+        joins, self._join_queue = self._join_queue, {}
+        try:
+            onboarded = await self.onboard_members(joins)
+        except Exception:
+            # put the batch back so it's retried next loop; a newer join for the same player wins.
+            for player_tag, clan_tag in joins.items():
+                self._join_queue.setdefault(player_tag, clan_tag)
+            self.join_stats['failed_batches'] += 1
+            log.exception(f'Failed to onboard {len(joins)} new members, they will be retried.')
             return
 
-        event_query = """INSERT INTO eventplayers (
-                                            player_tag,
-                                            trophies,
-                                            event_id,
-                                            start_friend_in_need,
-                                            start_sharing_is_caring,
-                                            start_attacks,
-                                            start_defenses,
-                                            start_trophies,
-                                            start_best_trophies,
-                                            start_update,
-                                            live
-                                            )
-                            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, True, True)
-                            ON CONFLICT (player_tag, event_id)
-                            DO UPDATE 
-                            SET live=True
-                            WHERE eventplayers.player_tag = $1
-                            AND eventplayers.event_id = $2
-                        """
+        self.join_stats['onboarded'] += onboarded
+        self.join_stats['last_batch'] = datetime.utcnow()
 
-        for n in fetch:
-            response = await self.bot.pool.execute(
-                event_query,
-                player.tag,
-                player.trophies,
-                n['id'],
-                player.achievements_dict['Friend in Need'].value,
-                player.achievements_dict['Sharing is caring'].value,
-                player.attack_wins,
-                player.defense_wins,
-                player.trophies,
-                player.best_trophies
-              )
-
-            log.debug(f'New member {member} joined clan {clan}. '
-                      f'Performed a query to insert them into eventplayers. Status Code: {response}')
+    async def onboard_members(self, joins):
+        players = await self.bot.background.fetch_players(list(joins.keys()))
+
+        player_rows, event_rows = [], []
+        for player in players:
+            stats = self.bot.background.player_stats(player)
+            player_rows.append(dict(stats, donations=player.donations, received=player.received))
+
+            for event in self.bot.background.get_clan_events(joins[player.tag]):
+                event_rows.append(dict(stats, event_id=event.id))
+
+        async with self.bot.pool.acquire() as con:
+            async with con.transaction():
+                await registry.execute(con, 'players_join_insert', *to_columns(player_rows, *JOIN_PLAYER_COLUMNS),
+                                       self.bot.seasonconfig.season_id)
+                if event_rows:
+                    await registry.execute(con, 'event_players_join', *to_columns(event_rows, *EVENT_JOIN_COLUMNS))
+
+        for n in event_rows:
+            self.bot.background.add_event_player(n['player_tag'], n['event_id'], n['best_trophies'])
+
+        log.debug(f'Onboarded {len(player_rows)} new members, {len(event_rows)} of them into events.')
+        return len(player_rows)
 
     async def new_board_message(self, channel, board_type):
         if not channel:
@@ -420,39 +366,14 @@ class DonationBoard(commands.Cog):
         return messages
 
     async def get_top_players(self, players, board_type, sort_by, in_event, season_id=None):
-        season_id = season_id or await self.bot.seasonconfig.get_season_id()
-        if board_type == 'donation':
-            column_1 = 'donations'
-            column_2 = 'received'
-            sort_by = 'donations' if sort_by == 'donation' else sort_by
-        elif board_type == 'trophy':
-            column_1 = 'trophies'
-            column_2 = 'trophies - start_trophies'
-            sort_by = column_2 if sort_by == 'gain' else column_1
-        else:
+        season_id = season_id or self.bot.seasonconfig.season_id
+        name = top_players_statement(board_type, sort_by, in_event)
+        if not name:
             return
 
-        # this should be ok since columns can only be a choice of 4 defined names
         if in_event:
-            query = f"""SELECT player_tag, {column_1}, {column_2} 
-                        FROM eventplayers 
-                        WHERE player_tag=ANY($1::TEXT[])
-                        AND live=true
-                        ORDER BY {sort_by} DESC NULLS LAST 
-                        LIMIT 100;
-                    """
-            fetch = await self.bot.pool.fetch(query, [n.tag for n in players])
-
-        else:
-            query = f"""SELECT player_tag, {column_1}, {column_2}
-                        FROM players 
-                        WHERE player_tag=ANY($1::TEXT[])
-                        AND season_id=$2
-                        ORDER BY {sort_by} DESC NULLS LAST
-                        LIMIT 100;
-                    """
-            fetch = await self.bot.pool.fetch(query, [n.tag for n in players], season_id)
-        return fetch
+            return await registry.fetch(self.bot.pool, name, [n.tag for n in players])
+        return await registry.fetch(self.bot.pool, name, [n.tag for n in players], season_id)
 
     async def update_board(self, channel_id):
         config = await self.bot.utils.board_config(channel_id)
@@ -465,11 +386,9 @@ class DonationBoard(commands.Cog):
             return
 
         if config.in_event:
-            query = """SELECT DISTINCT clan_tag FROM clans WHERE channel_id=$1 AND in_event=$2"""
-            fetch = await self.bot.pool.fetch(query, channel_id, config.in_event)
+            fetch = await registry.fetch(self.bot.pool, 'channel_clans_in_event', channel_id, config.in_event)
         else:
-            query = "SELECT DISTINCT clan_tag FROM clans WHERE channel_id=$1"
-            fetch = await self.bot.pool.fetch(query, channel_id)
+            fetch = await registry.fetch(self.bot.pool, 'channel_clans', channel_id)
 
         clans = await self.bot.coc.get_clans((n[0] for n in fetch)).flatten()
 
@@ -2,28 +2,35 @@ import datetime
 import discord
 
 from discord.ext import commands
+from functools import partial
 from typing import Union, List
 
 from cogs.utils.cache import cache, Strategy
 from cogs.utils.db_objects import LogConfig, BoardConfig, SlimEventConfig
+from cogs.utils.formatters import pack_messages
+from cogs.utils.log_queue import LogQueue
+from cogs.utils.statements import registry
+
+
+LOG_COALESCE_SECONDS = 2.0
 
 
 class Utils(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self._log_lines = {}
+        self.log_queues = {}
+        self.clan_names = {}
+        self.bot.supervisor.spawn('utils.sync_clan_names', self.sync_clan_names, owner=self)
+
+    def cog_unload(self):
+        self.bot.supervisor.cancel_owner(self)
+        for queue in self.log_queues.values():
+            queue.close()
 
     @cache()
     async def log_config(self, channel_id: int, log_type: str) -> Union[LogConfig, None]:
-        query = """SELECT guild_id, 
-                          channel_id, 
-                          "interval", 
-                          toggle,
-                          type 
-                   FROM logs 
-                   WHERE channel_id=$1 
-                   AND type=$2
-                """
-        fetch = await self.bot.pool.fetchrow(query, channel_id, log_type)
+        fetch = await registry.fetchrow(self.bot.pool, 'log_config', channel_id, log_type)
         if not fetch:
             return None
 
@@ -31,19 +38,7 @@ class Utils(commands.Cog):
 
     @cache()
     async def board_config(self, channel_id: int) -> Union[BoardConfig, None]:
-        query = """SELECT guild_id, 
-                          channel_id,
-                          icon_url,
-                          title,
-                          render,
-                          sort_by,
-                          toggle,
-                          type,
-                          in_event
-                   FROM boards 
-                   WHERE channel_id = $1
-                """
-        fetch = await self.bot.pool.fetchrow(query, channel_id)
+        fetch = await registry.fetchrow(self.bot.pool, 'board_config', channel_id)
 
         if not fetch:
             return None
@@ -52,8 +47,7 @@ class Utils(commands.Cog):
 
     @cache()
     async def get_board_channels(self, guild_id: int, board_type: str) -> Union[List[int], None]:
-        query = "SELECT channel_id FROM boards WHERE guild_id = $1 AND type = $2 AND toggle = True;"
-        fetch = await self.bot.pool.fetch(query, guild_id, board_type)
+        fetch = await registry.fetch(self.bot.pool, 'board_channels', guild_id, board_type)
         return [n["channel_id"] for n in fetch]
 
     async def get_board_configs(self, guild_id: int, board_type: str, invalidate=False) -> List[BoardConfig]:
@@ -99,12 +93,27 @@ class Utils(commands.Cog):
                                fetch['finish'], fetch['event_name'],
                                fetch['channel_id'], fetch['guild_id'])
 
-    @cache()
+    async def sync_clan_names(self):
+        fetch = await registry.fetch(self.bot.pool, 'all_clan_names')
+
+        clan_names = {}
+        for n in fetch:
+            clan_names.setdefault(n['guild_id'], {})[n['clan_tag']] = n['clan_name']
+        self.clan_names = clan_names
+
+    def get_guild_clan_names(self, guild_id: int) -> dict:
+        return self.clan_names.get(guild_id, {})
+
     async def get_clan_name(self, guild_id: int, tag: str) -> str:
-        query = "SELECT clan_name FROM clans WHERE clan_tag=$1 AND guild_id=$2"
-        fetch = await self.bot.pool.fetchrow(query, tag, guild_id)
+        try:
+            return self.clan_names[guild_id][tag]
+        except KeyError:
+            pass
+
+        fetch = await registry.fetchrow(self.bot.pool, 'clan_name', tag, guild_id)
         if not fetch:
             return 'Unknown'
+        self.clan_names.setdefault(guild_id, {})[tag] = fetch[0]
         return fetch[0]
 
     @cache()
@@ -126,24 +135,41 @@ class Utils(commands.Cog):
         fetch = await self.bot.pool.fetch(query)
         self.bot.coc._clan_updates = [n[0] for n in fetch]
 
-    async def channel_log(self, channel_id, log_type, message, colour=None, embed=True):
+    async def channel_log(self, channel_id, log_type, messages, colour=None, embed=True):
         config = await self.log_config(channel_id, log_type)
-        if not config.channel or not config.toggle:
+        if not config or not config.channel or not config.toggle:
             return
 
-        if embed:
-            e = discord.Embed(colour=colour or self.bot.colour,
-                              description=message,
-                              timestamp=datetime.datetime.utcnow())
-            c = None
-        else:
-            e = None
-            c = message
-
-        try:
-            await config.channel.send(content=c, embed=e)
-        except (discord.Forbidden, discord.HTTPException):
-            return
+        queue = self.get_log_queue(channel_id)
+        for message in messages:
+            if embed:
+                e = discord.Embed(colour=colour or self.bot.colour,
+                                  description=message,
+                                  timestamp=datetime.datetime.utcnow())
+                queue.put(embed=e)
+            else:
+                queue.put(content=message)
+
+    def get_log_queue(self, channel_id):
+        queue = self.log_queues.get(channel_id)
+        if queue is None:  # an empty queue is falsy
+            queue = self.log_queues[channel_id] = LogQueue(self.bot, channel_id)
+        return queue
+
+    def queue_log_lines(self, channel_id, log_type, lines):
+        # lines are held briefly so a report's lines are packed into as few messages as possible.
+        # they're kept apart per log type, since each type has its own config and toggle for the channel.
+        key = (channel_id, log_type)
+        if key not in self._log_lines:
+            self._log_lines[key] = []
+            self.bot.loop.call_later(LOG_COALESCE_SECONDS, self._flush_log_lines, channel_id, log_type)
+
+        self._log_lines[key].extend(lines)
+
+    def _flush_log_lines(self, channel_id, log_type):
+        lines = self._log_lines.pop((channel_id, log_type))
+        self.bot.supervisor.spawn('utils.channel_log', partial(self.channel_log, channel_id, log_type,
+                                                               pack_messages(lines), embed=False), owner=self)
 
     async def event_config_id(self, event_id: int) -> Union[None, SlimEventConfig]:
         query = """SELECT id,
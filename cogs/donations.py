@@ -87,7 +87,7 @@ class Donations(commands.Cog):
                     AND season_id=$2
                     ORDER BY donations DESC NULLS LAST
                 """
-        fetch = await ctx.db.fetch(query, user.id, await self.bot.seasonconfig.get_season_id())
+        fetch = await ctx.db.fetch(query, user.id, self.bot.seasonconfig.season_id)
         if not fetch:
             return await ctx.send(f"{'You dont' if ctx.author == user else f'{str(user)} doesnt'} "
                                   f"have any accounts claimed")
@@ -123,7 +123,7 @@ class Donations(commands.Cog):
                     AND season_id=$2
                     ORDER BY donations DESC NULLS LAST
                 """
-        fetch = await ctx.db.fetch(query, player.tag, await self.bot.seasonconfig.get_season_id())
+        fetch = await ctx.db.fetch(query, player.tag, self.bot.seasonconfig.season_id)
 
         if not fetch:
             raise commands.BadArgument(f"{str(player)} ({player.tag}) has not been claimed.")
@@ -165,7 +165,7 @@ class Donations(commands.Cog):
         for n in clans:
             tags.extend(x.tag for x in n.itermembers)
 
-        fetch = await ctx.db.fetch(query, tags, await self.bot.seasonconfig.get_season_id())
+        fetch = await ctx.db.fetch(query, tags, self.bot.seasonconfig.season_id)
 
         if not fetch:
             return await ctx.send(f"No players claimed for clans "
@@ -1,24 +1,30 @@
 import asyncio
 import asyncpg
-import discord
 import logging
-import math
 import time
 
-from datetime import datetime
+from datetime import datetime, timedelta
 from discord.ext import commands, tasks
 
 from cogs.utils.db_objects import SlimDonationEvent
 from cogs.utils.formatters import format_donation_log_message
+from cogs.utils.statements import registry, to_columns, DONATION_EVENT_COLUMNS
+from cogs.utils.interval_logs import IntervalLogMixin
 
 log = logging.getLogger(__name__)
 
+# events older than this aren't replayed after a restart
+MAX_REPLAY_AGE = timedelta(hours=1)
 EVENTS_TABLE_TYPE = 'donation'
 
-class DonationLogs(commands.Cog):
+class DonationLogs(IntervalLogMixin, commands.Cog):
+    log_type = EVENTS_TABLE_TYPE
+
     def __init__(self, bot):
         self.bot = bot
         self._batch_data = []
+        self._report_batch = []
+        self.clan_channels = {}
         self._batch_lock = asyncio.Lock(loop=bot.loop)
         self.batch_insert_loop.add_exception_type(asyncpg.PostgresConnectionError)
         self.batch_insert_loop.start()
@@ -32,8 +38,9 @@ class DonationLogs(commands.Cog):
         self.bot.coc._clan_retry_interval = 60
         self.bot.coc.start_updates('clan')
 
-        self._tasks = {}
-        asyncio.ensure_future(self.sync_temp_event_tasks())
+        self.bot.supervisor.spawn('donationlogs.sync_clan_channels', self.sync_clan_channels, owner=self)
+        self.bot.supervisor.spawn('donationlogs.replay_unreported_events', self.replay_unreported_events, owner=self)
+        self.start_interval_logs()
 
     def cog_unload(self):
         self.report_task.cancel()
@@ -42,162 +49,165 @@ class DonationLogs(commands.Cog):
             self.on_clan_member_donation,
             self.on_clan_member_received
         )
-        for k, v in self._tasks:
-            v.cancel()
+        self.bot.supervisor.cancel_owner(self)
+        self.stop_interval_logs()
 
     @tasks.loop(seconds=60.0)
     async def batch_insert_loop(self):
         log.debug('Starting batch insert loop for donationlogs.')
+        if self.bot.donationboard:
+            return  # events are written with the donationboard's flush, see `DonationBoard.bulk_insert`
+
         async with self._batch_lock:
             await self.bulk_insert()
 
     async def bulk_insert(self):
-        query = """INSERT INTO donationevents (player_tag, player_name, clan_tag, 
-                                                 donations, received, time, season_id)
-                        SELECT x.player_tag, x.player_name, x.clan_tag, 
-                               x.donations, x.received, x.time, x.season_id
-                           FROM jsonb_to_recordset($1::jsonb) 
-                        AS x(player_tag TEXT, player_name TEXT, clan_tag TEXT, 
-                             donations INTEGER, received INTEGER, time TIMESTAMP, season_id INTEGER
-                             )
-                """
-
         if self._batch_data:
-            await self.bot.pool.execute(query, self._batch_data)
+            await registry.execute(self.bot.pool, 'donationevents_insert',
+                                   *to_columns(self._batch_data, *DONATION_EVENT_COLUMNS))
             total = len(self._batch_data)
             if total > 1:
                 log.debug('Registered %s donation events to the database.', total)
             self._batch_data.clear()
 
+    def get_batch(self):
+        return list(self._batch_data)
+
+    def clear_batch(self, count):
+        # events may have been added while the batch was being flushed, so only remove what was written.
+        del self._batch_data[:count]
+
     @tasks.loop(seconds=60.0)
     async def report_task(self):
         log.debug('Starting bulk report loop for donations.')
         start = time.perf_counter()
+        if self.report_task.current_loop % 10 == 0:
+            await self.sync_clan_channels()
+            await self.sync_interval_channels()
+
         async with self._batch_lock:
             await self.bulk_report()
         log.debug('Time taken: %s ms', (time.perf_counter() - start)*1000)
 
-    async def sync_temp_event_tasks(self):
-        query = """SELECT channel_id 
-                   FROM logs 
-                   WHERE toggle = True 
-                   AND interval > make_interval()
-                   AND type = $1
-                """
-        fetch = await self.bot.pool.fetch(query, EVENTS_TABLE_TYPE)
-        for n in fetch:
-            channel_id = n[0]
-            log.debug(f'Syncing task for Channel ID {channel_id}')
-            task = self._tasks.get(channel_id)
-            if not task:
-                log.debug(f'Task has not been created. Creating it. Channel ID: {channel_id}')
-                self._tasks[channel_id] = self.bot.loop.create_task(self.create_temp_event_task(channel_id))
-                continue
-            elif task.done():
-                log.info(task.get_stack())
-                log.info(f'Task has already been completed, recreating it. Channel ID: {channel_id}')
-                self._tasks[channel_id] = self.bot.loop.create_task(self.create_temp_event_task(channel_id))
-                continue
-            else:
-                log.debug(f'Task has already been sucessfully registered for Channel ID {channel_id}')
+    @report_task.before_loop
+    async def before_report_task(self):
+        # start on the minute so donation and trophy reports for a channel go out together.
+        now = datetime.utcnow()
+        await asyncio.sleep(60 - now.second - now.microsecond / 1e6)
 
-        to_cancel = [n for n in self._tasks.keys() if n not in set(n[0] for n in fetch)]
-        for n in to_cancel:
-            log.debug(f'Channel events have been removed from DB. Destroying task. Channel ID: {n}')
-            task = self._tasks.pop(n)
-            task.cancel()
+    async def sync_clan_channels(self):
+        fetch = await registry.fetch(self.bot.pool, 'log_clan_channels', EVENTS_TABLE_TYPE)
 
-        log.info(f'Successfully synced {len(fetch)} channel tasks.')
+        clan_channels = {}
+        for n in fetch:
+            clan_channels.setdefault(n['clan_tag'], []).append(n['channel_id'])
 
-    async def add_temp_events(self, channel_id, fmt):
-        query = "INSERT INTO tempevents (channel_id, fmt, type) VALUES ($1, $2, $3)"
-        await self.bot.pool.execute(query, channel_id, fmt, EVENTS_TABLE_TYPE)
-        log.debug(f'Added a message for channel id {channel_id} to tempevents db')
+        self.clan_channels = clan_channels
+        log.debug(f'Synced {len(fetch)} clan log channels.')
 
-    async def create_temp_event_task(self, channel_id):
-        try:
-            while not self.bot.is_closed():
-                config = await self.bot.utils.log_config(channel_id, EVENTS_TABLE_TYPE)
-                if not config:
-                    log.critical(f'Requested a task creation for channel id {channel_id}'
-                                 ' but config was not found.')
+    def add_digest_events(self, config, events):
+        # digest channels keep one running total per player for the interval instead of one line per event.
+        self.schedule_interval_channel(config)
 
-                await asyncio.sleep(config.seconds)
+        guild_id, digest = self._digest_buffers.setdefault(config.channel_id, (config.guild_id, {}))
+        for x in sorted(events, key=lambda n: n['time']):
+            key = (x['clan_tag'], x['player_tag'])
+            player = digest.get(key)
+            if not player:
+                digest[key] = dict(x)
+            else:
+                player['player_name'] = x['player_name']
+                player['donations'] += x['donations']
+                player['received'] += x['received']
+
+    def pop_digest_messages(self, channel_id):
+        guild_id, digest = self._digest_buffers.pop(channel_id, (None, {}))
+        players = digest.values()
+        clan_names = self.bot.utils.get_guild_clan_names(guild_id)
+
+        messages = []
+        for x in sorted(players, key=lambda n: (n['clan_tag'], -n['donations'], -n['received'])):
+            clan_name = clan_names.get(x['clan_tag'], 'Unknown')
+            if x['donations']:
+                slim_event = SlimDonationEvent(x['donations'], 0, x['player_name'], x['clan_tag'])
+                messages.append(format_donation_log_message(slim_event, clan_name))
+            if x['received']:
+                slim_event = SlimDonationEvent(0, x['received'], x['player_name'], x['clan_tag'])
+                messages.append(format_donation_log_message(slim_event, clan_name))
+        return messages
 
-                query = "DELETE FROM tempevents WHERE channel_id = $1 AND type = $2 RETURNING fmt"
-                fetch = await self.bot.pool.fetch(query, channel_id, EVENTS_TABLE_TYPE)
+    async def replay_unreported_events(self):
+        # events that were archived but not reported before a restart are reported now.
+        reported_to = await registry.fetchval(self.bot.pool, 'log_cursor', EVENTS_TABLE_TYPE)
+        if not reported_to:
+            return
 
-                for n in fetch:
-                    asyncio.ensure_future(self.bot.utils.channel_log(channel_id, EVENTS_TABLE_TYPE, n[0], embed=False))
+        since = max(reported_to, datetime.utcnow() - MAX_REPLAY_AGE)
+        fetch = await registry.fetch(self.bot.pool, 'donationevents_since', since)
 
-                log.debug(f'Dispatching {len(fetch)} logs after sleeping for {config.seconds} '
-                          f'sec to channel {config.channel} ({config.channel_id})')
+        async with self._batch_lock:
+            self._report_batch[:0] = [dict(n) for n in fetch]
+        log.info(f'Replaying {len(fetch)} unreported events since {since}.')
 
-        except asyncio.CancelledError:
-            raise
-        except (OSError, discord.ConnectionClosed, asyncpg.PostgresConnectionError):
-            log.exception(f'Exception encountered while running task for {channel_id}')
-            self._tasks[channel_id].cancel()
-            self._tasks[channel_id] = self.bot.loop.create_task(self.create_temp_event_task(channel_id))
+    @staticmethod
+    def format_events(events, clan_name):
+        messages = []
+        for x in events:
+            slim_event = SlimDonationEvent(x['donations'], x['received'], x['player_name'], x['clan_tag'])
+            messages.append(format_donation_log_message(slim_event, clan_name))
+        return messages
 
     async def bulk_report(self):
-        query = """SELECT DISTINCT clans.channel_id 
-                   FROM clans 
-                   INNER JOIN donationevents 
-                   ON clans.clan_tag = donationevents.clan_tag 
-                   WHERE donationevents.reported=False
-                """
-        fetch = await self.bot.pool.fetch(query)
-
-        query = """SELECT donationevents.clan_tag, 
-                          donationevents.donations, 
-                          donationevents.received, 
-                          donationevents.player_name, 
-                          donationevents.time
-                    FROM donationevents 
-                        INNER JOIN clans 
-                        ON clans.clan_tag = donationevents.clan_tag 
-                    WHERE clans.channel_id=$1 
-                    AND donationevents.reported=False
-                    ORDER BY donationevents.clan_tag, 
-                             time DESC;
-                """
-
-        for n in fetch:
-            config = await self.bot.utils.log_config(n[0], 'donation')
+        events, self._report_batch = self._report_batch, []
+        if not events:
+            return
+        reported_to = max(n['time'] for n in events)
+
+        clan_events = {}
+        for event in events:
+            clan_events.setdefault(event['clan_tag'], []).append(event)
+
+        channel_clans = {}
+        for clan_tag in sorted(clan_events.keys()):
+            clan_events[clan_tag].sort(key=lambda n: n['time'], reverse=True)
+            for channel_id in self.clan_channels.get(clan_tag, ()):
+                channel_clans.setdefault(channel_id, []).append(clan_tag)
+
+        # a clan's lines only depend on the guild, so they're formatted once and reused for each channel.
+        formatted = {}
+        for channel_id, clan_tags in channel_clans.items():
+            config = await self.bot.utils.log_config(channel_id, EVENTS_TABLE_TYPE)
 
             if not config:
                 continue
             if not config.toggle:
                 continue
+            if config.digest and config.seconds > 0:
+                self.add_digest_events(config, [x for clan_tag in clan_tags for x in clan_events[clan_tag]])
+                continue
 
-            events = await self.bot.pool.fetch(query, n[0])
-
+            clan_names = self.bot.utils.get_guild_clan_names(config.guild_id)
             messages = []
-            for x in events:
-                slim_event = SlimDonationEvent(x['donations'], x['received'], x['player_name'], x['clan_tag'])
-                clan_name = await self.bot.utils.get_clan_name(config.guild_id, slim_event.clan_tag)
-                messages.append(format_donation_log_message(slim_event, clan_name))
+            for clan_tag in clan_tags:
+                key = (clan_tag, config.guild_id)
+                if key not in formatted:
+                    clan_name = clan_names.get(clan_tag, 'Unknown')
+                    formatted[key] = self.format_events(clan_events[clan_tag], clan_name)
+                messages.extend(formatted[key])
+
+            if config.seconds > 0:
+                self.add_interval_messages(config, messages)
+            else:
+                log.debug(f'Dispatching {len(messages)} logs to channel '
+                          f'{config.channel} (ID {config.channel_id})')
+                self.bot.utils.queue_log_lines(config.channel_id, EVENTS_TABLE_TYPE, messages)
+
+        await registry.execute(self.bot.pool, 'log_cursor_update', EVENTS_TABLE_TYPE, reported_to)
 
-            group_batch = []
-            for i in range(math.ceil(len(messages) / 20)):
-                group_batch.append(messages[i*20:(i+1)*20])
-
-            for x in group_batch:
-                if config.seconds > 0:
-                    await self.add_temp_events(config.channel_id, '\n'.join(x))
-                else:
-                    log.debug(f'Dispatching a log to channel '
-                              f'{config.channel} (ID {config.channel_id})')
-                    asyncio.ensure_future(self.bot.utils.channel_log(config.channel_id, EVENTS_TABLE_TYPE,
-                                                                     '\n'.join(x), embed=False))
-
-        query = """UPDATE donationevents
-                        SET reported=True
-                   WHERE reported=False
-                """
-        removed = await self.bot.pool.execute(query)
-        log.debug('Removed events from the database. Status Code %s', removed)
+    def add_event(self, event):
+        # events are reported straight from memory - the events table is only an archive.
+        self._batch_data.append(event)
+        self._report_batch.append(event)
 
     async def on_clan_member_donation(self, old_donations, new_donations, player, clan):
         log.debug(f'Received on_clan_member_donation event for player {player} of clan {clan}')
@@ -207,14 +217,14 @@ class DonationLogs(commands.Cog):
             donations = new_donations - old_donations
 
         async with self._batch_lock:
-            self._batch_data.append({
+            self.add_event({
                 'player_tag': player.tag,
                 'player_name': player.name,
                 'clan_tag': clan.tag,
                 'donations': donations,
                 'received': 0,
-                'time': datetime.utcnow().isoformat(),
-                'season_id': await self.bot.seasonconfig.get_season_id()
+                'time': datetime.utcnow(),
+                'season_id': self.bot.seasonconfig.season_id
             })
 
     async def on_clan_member_received(self, old_received, new_received, player, clan):
@@ -225,14 +235,14 @@ class DonationLogs(commands.Cog):
             received = new_received - old_received
 
         async with self._batch_lock:
-            self._batch_data.append({
+            self.add_event({
                 'player_tag': player.tag,
                 'player_name': player.name,
                 'clan_tag': clan.tag,
                 'donations': 0,
                 'received': received,
-                'time': datetime.utcnow().isoformat(),
-                'season_id': await self.bot.seasonconfig.get_season_id()
+                'time': datetime.utcnow(),
+                'season_id': self.bot.seasonconfig.season_id
             })
 
 
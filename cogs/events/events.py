@@ -4,6 +4,7 @@ import logging
 import math
 import typing
 
+from datetime import datetime
 from discord.ext import commands
 from cogs.utils.converters import ClanConverter, PlayerConverter
 from cogs.utils.error_handler import error_handler
@@ -13,6 +14,8 @@ from cogs.utils.paginator import LogsPaginator
 
 log = logging.getLogger(__name__)
 
+MAX_EVENT_ID = 2 ** 31 - 1
+
 
 def columns(table_name):
     if table_name == 'trophyevents':
@@ -27,93 +30,73 @@ class Events(commands.Cog):
         self.bot = bot
 
     @staticmethod
-    async def recent_events(table_name, ctx, limit):
+    async def paginate_events(table_name, ctx, condition, args, limit, title):
+        """Paginate events matching `condition`, fetching each page with a keyset query as it's needed.
+
+        Returns ``False`` if no events were found.
+        """
         col, col2 = columns(table_name)
+        n = len(args)
 
-        query = f"""SELECT player_tag, {col}, {col2}, time, player_name
-                    FROM {table_name}
-                    WHERE {table_name}.clan_tag = ANY(
-                                SELECT DISTINCT clan_tag FROM clans
-                                WHERE guild_id=$1
-                                )
-                    ORDER BY {table_name}.time DESC
-                    LIMIT $2
+        query = f"""SELECT COUNT(*) FROM (
+                        SELECT 1 FROM {table_name}
+                        WHERE {condition}
+                        LIMIT ${n + 1}
+                    ) AS x
                 """
-        fetch = await ctx.db.fetch(query, ctx.guild.id, limit)
-        if not fetch:
-            return await ctx.send('No events found. Please ensure you have '
-                                  'enabled logging and have claimed a clan.')
+        total = await ctx.db.fetchval(query, *args, limit)
+        if not total:
+            return False
 
-        no_pages = math.ceil(len(fetch) / 20)
-        title = f"Recent Events for Guild {ctx.guild.name}"
-
-        p = LogsPaginator(ctx, fetch, page_count=no_pages, title=title)
-        await p.paginate()
-
-    @staticmethod
-    async def user_events(table_name, ctx, user, limit):
-        col, col2 = columns(table_name)
-        query = f"""SELECT {table_name}.player_tag, 
-                           {table_name}.{col}, 
-                           {table_name}.{col2}, 
-                           {table_name}.time, 
-                           {table_name}.player_name
-                    FROM {table_name} 
-                        INNER JOIN players
-                        ON {table_name}.player_tag = players.player_tag 
-                    WHERE players.user_id = $1 
-                    ORDER BY time DESC 
-                    LIMIT $2;
+        query = f"""SELECT player_tag, {col}, {col2}, time, player_name, id AS event_id
+                    FROM {table_name}
+                    WHERE {condition}
+                    AND (time, id) < (${n + 1}, ${n + 2})
+                    ORDER BY time DESC, id DESC
+                    LIMIT ${n + 3}
                 """
-        fetch = await ctx.db.fetch(query, user.id, limit)
-        if not fetch:
-            return await ctx.send(f'No events found.')
 
-        title = f'Recent Events for {str(user)}'
-        no_pages = math.ceil(len(fetch) / 20)
+        async def fetch(last_row, count):
+            if last_row:
+                time, event_id = last_row['time'], last_row['event_id']
+            else:
+                time, event_id = datetime.max, MAX_EVENT_ID
+            return await ctx.db.fetch(query, *args, time, event_id, count)
 
-        p = LogsPaginator(ctx, data=fetch, title=title, page_count=no_pages)
+        no_pages = math.ceil(total / 20)
+        p = LogsPaginator(ctx, title=title, page_count=no_pages, fetch=fetch, total=total)
         await p.paginate()
+        return True
 
-    @staticmethod
-    async def player_events(table_name, ctx, player, limit):
-        col, col2 = columns(table_name)
+    async def recent_events(self, table_name, ctx, limit):
+        condition = "clan_tag = ANY(SELECT DISTINCT clan_tag FROM clans WHERE guild_id=$1)"
+        title = f"Recent Events for Guild {ctx.guild.name}"
 
-        query = f"""SELECT player_tag, {col}, {col2}, time, player_name
-                    FROM {table_name} 
-                    WHERE player_tag = $1 
-                    ORDER BY time DESC 
-                    LIMIT $2
-                """
-        fetch = await ctx.db.fetch(query, player.tag, limit)
-        if not fetch:
-            return await ctx.send('Account has not been added/claimed.')
+        if not await self.paginate_events(table_name, ctx, condition, [ctx.guild.id], limit, title):
+            await ctx.send('No events found. Please ensure you have '
+                           'enabled logging and have claimed a clan.')
 
-        title = f'Recent Events for {player.name}'
+    async def user_events(self, table_name, ctx, user, limit):
+        condition = "player_tag = ANY(SELECT DISTINCT player_tag FROM players WHERE user_id=$1)"
+        title = f'Recent Events for {str(user)}'
 
-        no_pages = math.ceil(len(fetch) / 20)
+        if not await self.paginate_events(table_name, ctx, condition, [user.id], limit, title):
+            await ctx.send(f'No events found.')
 
-        p = LogsPaginator(ctx, data=fetch, title=title, page_count=no_pages)
-        await p.paginate()
+    async def player_events(self, table_name, ctx, player, limit):
+        condition = "player_tag = $1"
+        title = f'Recent Events for {player.name}'
 
-    @staticmethod
-    async def clan_events(table_name, ctx, clans, limit):
-        col, col2 = columns(table_name)
-        query = f"""SELECT player_tag, {col}, {col2}, time, player_name
-                    FROM {table_name}
-                    WHERE clan_tag = ANY($1::TEXT[])
-                    ORDER BY time DESC 
-                    LIMIT $2
-                """
-        fetch = await ctx.db.fetch(query, list(set(n.tag for n in clans)), limit)
-        if not fetch:
-            return await ctx.send('No events found.')
+        if not await self.paginate_events(table_name, ctx, condition, [player.tag], limit, title):
+            await ctx.send('Account has not been added/claimed.')
 
+    async def clan_events(self, table_name, ctx, clans, limit):
+        condition = "clan_tag = ANY($1::TEXT[])"
         title = f"Recent Events for {', '.join(n.name for n in clans)}"
-        no_pages = math.ceil(len(fetch) / 20)
 
-        p = LogsPaginator(ctx, data=fetch, title=title, page_count=no_pages)
-        await p.paginate()
+        if not await self.paginate_events(table_name, ctx, condition, [list(set(n.tag for n in clans))],
+                                          limit, title):
+            await ctx.send('No events found.')
 
     @commands.group(invoke_without_command=True)
     async def donationevents(self, ctx, limit: typing.Optional[int] = 1000, *,
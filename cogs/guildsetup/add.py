@@ -162,7 +162,7 @@ class Add(commands.Cog):
 
         await ctx.send('Clan has been added. Please wait a moment while all players are added.')
 
-        season_id = await self.bot.seasonconfig.get_season_id()
+        season_id = self.bot.seasonconfig.season_id
         async for member in clan.get_detailed_members():
             await self.insert_player(ctx.db, member, season_id, in_event,
                                      getattr(ctx.config, 'event_id', None))
@@ -195,7 +195,7 @@ class Add(commands.Cog):
         else:
             prompt = False
 
-        season_id = await self.bot.seasonconfig.get_season_id()
+        season_id = self.bot.seasonconfig.season_id
         await self.insert_player(ctx.db, player, season_id, prompt,
                                  getattr(ctx.config, 'event_id', None))
 
@@ -224,7 +224,7 @@ class Add(commands.Cog):
         if not isinstance(player, coc.SearchPlayer):
             player = await self.bot.coc.get_player(player.tag)
 
-        season_id = await self.bot.seasonconfig.get_season_id()
+        season_id = self.bot.seasonconfig.season_id
         query = "SELECT user_id FROM players WHERE player_tag = $1 AND season_id = $2"
         fetch = await ctx.db.fetchrow(query, player.tag, season_id)
 
@@ -569,6 +569,7 @@ class Add(commands.Cog):
         prompt = await ctx.prompt(f'Would you like me to add all clans claimed on the server to this donationlog?\n'
                                   f'Else you can manually add clans with `+add clan #CLAN_TAG` to this channel.\n')
         if not prompt:
+            await self.bot.donationlogs.sync_clan_channels()
             return await ctx.send(f'{channel.mention} has been added as a donationlog channel.\n'
                                   f'Please note that only clans claimed to {channel.mention} will appear in this log.')
 
@@ -592,6 +593,7 @@ class Add(commands.Cog):
                    DO NOTHING;
                 """
         await ctx.db.execute(query, ctx.guild.id, channel.id)
+        await self.bot.donationlogs.sync_clan_channels()
         return await ctx.send(f'{channel.mention} has been added as a donationlog channel. '
                               'See all clans claimed with `+info clans`. '
                               'Please note that only clans claimed to this channel will appear in the log.')
@@ -641,6 +643,7 @@ class Add(commands.Cog):
             f'Would you like me to add all clans claimed on the server to this trophylog?\n'
             f'Else you can manually add clans with `+add clan #CLAN_TAG` to this channel.\n')
         if not prompt:
+            await self.bot.trophylogs.sync_clan_channels()
             return await ctx.send(f'{channel.mention} has been added as a trophylog channel.\n'
                                   f'Please note that only clans claimed to {channel.mention} will appear in this log.')
 
@@ -664,6 +667,7 @@ class Add(commands.Cog):
                    DO NOTHING;
                 """
         await ctx.db.execute(query, ctx.guild.id, channel.id)
+        await self.bot.trophylogs.sync_clan_channels()
         return await ctx.send(f'{channel.mention} has been added as a trophylog channel. '
                               'See all clans claimed with `+info clans`. '
                               'Please note that only clans claimed to this channel will appear in the log.')
@@ -439,6 +439,7 @@ class Edit(commands.Cog):
                    AND type = $3
                 """
         await ctx.db.execute(query, str(minutes), ctx.config.channel_id, 'donation')
+        await self.bot.donationlogs.sync_interval_channels()
         await ctx.send(f'Logs for {ctx.config.channel.mention} have been changed to {minutes} minutes. '
                        f'Find which clans this affects with `+info {ctx.config.channel}`')
 
@@ -466,12 +467,46 @@ class Edit(commands.Cog):
                    RETURNING toggle
                 """
         toggle = await ctx.db.fetch(query, ctx.config.channel_id, 'donation')
+        await self.bot.donationlogs.sync_interval_channels()
         if toggle:
             condition = 'on'
         else:
             condition = 'off'
         await ctx.send(f'Logs for {ctx.config.channel.mention} have been turned {condition}.')
 
+    @edit_donationlog.command(name='digest')
+    async def edit_donationlog_digest(self, ctx):
+        """Toggle digest mode for the donation log.
+
+        With an interval set, digest mode sends one line per player with their net donations and received for the interval,
+        instead of one line per donation event.
+
+        **Format**
+        :information_source: `+edit donationlog digest`
+
+        **Example**
+        :white_check_mark: `+edit donationlog digest`
+
+        **Required Permissions**
+        :warning: Manage Server
+        """
+        if not ctx.config:
+            return await ctx.send('Oops! It doesn\'t look like a donationlog is setup here. '
+                                  'Try `+info` to find where the registered channels are!')
+
+        query = """UPDATE logs
+                   SET digest = NOT digest
+                   WHERE channel_id=$1
+                   AND type = $2
+                   RETURNING digest
+                """
+        digest = await ctx.db.fetchval(query, ctx.config.channel_id, 'donation')
+        if digest:
+            condition = 'on'
+        else:
+            condition = 'off'
+        await ctx.send(f'Digest mode for {ctx.config.channel.mention} has been turned {condition}.')
+
     @edit.group(name='trophylog')
     @manage_guild()
     @requires_config('trophylog', invalidate=True)
@@ -507,6 +542,7 @@ class Edit(commands.Cog):
                    AND type = $3
                 """
         await ctx.db.execute(query, str(minutes), ctx.config.channel_id, 'trophy')
+        await self.bot.trophylogs.sync_interval_channels()
         await ctx.send(f'Logs for {ctx.config.channel.mention} have been changed to {minutes} minutes. '
                        f'Find which clans this affects with `+info {ctx.config.channel}`')
 
@@ -534,12 +570,46 @@ class Edit(commands.Cog):
                    RETURNING toggle
                 """
         toggle = await ctx.db.execute(query, ctx.config.channel_id, 'trophy')
+        await self.bot.trophylogs.sync_interval_channels()
         if toggle:
             condition = 'on'
         else:
             condition = 'off'
         await ctx.send(f'Logs for {ctx.config.channel.mention} have been turned {condition}.')
 
+    @edit_trophylog.command(name='digest')
+    async def edit_trophylog_digest(self, ctx):
+        """Toggle digest mode for the trophy log.
+
+        With an interval set, digest mode sends one line per player with their net trophy change for the interval,
+        instead of one line per trophy event.
+
+        **Format**
+        :information_source: `+edit trophylog digest`
+
+        **Example**
+        :white_check_mark: `+edit trophylog digest`
+
+        **Required Permissions**
+        :warning: Manage Server
+        """
+        if not ctx.config:
+            return await ctx.send('Oops! It doesn\'t look like a trophylog is setup here. '
+                                  'Try `+info` to find where the registered channels are!')
+
+        query = """UPDATE logs
+                   SET digest = NOT digest
+                   WHERE channel_id=$1
+                   AND type = $2
+                   RETURNING digest
+                """
+        digest = await ctx.db.fetchval(query, ctx.config.channel_id, 'trophy')
+        if digest:
+            condition = 'on'
+        else:
+            condition = 'off'
+        await ctx.send(f'Digest mode for {ctx.config.channel.mention} has been turned {condition}.')
+
     @edit.command(name='event')
     @manage_guild()
     @requires_config('event', invalidate=True)
@@ -792,7 +862,7 @@ class Edit(commands.Cog):
                         WHERE player_tag = ANY($1::TEXT[])
                         AND event_id = $2
                     """
-            season_id = await self.bot.seasonconfig.get_season_id()
+            season_id = self.bot.seasonconfig.season_id
             for clan in clans:
                 for member in clan.members:
                     await ctx.db.execute(query, member.donations, member.tag, season_id)
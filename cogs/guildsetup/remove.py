@@ -100,7 +100,7 @@ class Remove(commands.Cog):
         :white_check_mark: `+remove discord #P0LYJC8C`
         :white_check_mark: `+remove discord mathsman`
         """
-        season_id = await self.bot.seasonconfig.get_season_id()
+        season_id = self.bot.seasonconfig.season_id
         if ctx.channel.permissions_for(ctx.author).manage_guild \
                 or await self.bot.is_owner(ctx.author):
             query = "UPDATE players SET user_id = NULL WHERE player_tag = $1 AND season_id = $2"
@@ -210,6 +210,8 @@ class Remove(commands.Cog):
 
         query = "DELETE FROM logs WHERE channel_id = $1 AND type = $2"
         await ctx.db.execute(query, ctx.config.channel_id, 'donation')
+        await self.bot.donationlogs.sync_clan_channels()
+        await self.bot.donationlogs.sync_interval_channels()
         await ctx.confirm()
 
     @remove.command(name='trophylog')
@@ -235,6 +237,8 @@ class Remove(commands.Cog):
 
         query = "DELETE FROM logs WHERE channel_id = $1 AND type = $2"
         await ctx.db.execute(query, ctx.config.channel_id, 'trophy')
+        await self.bot.trophylogs.sync_clan_channels()
+        await self.bot.trophylogs.sync_interval_channels()
         await ctx.confirm()
 
     @remove.command(name='event')
@@ -12,6 +12,7 @@ from discord.ext import commands, tasks
 from cogs.utils.converters import ClanConverter, PlayerConverter
 from cogs.utils.formatters import readable_time
 from cogs.utils.paginator import LastOnlinePaginator
+from cogs.utils.statements import registry, to_columns, LAST_UPDATED_COLUMNS
 
 
 class LastUpdated(commands.Cog):
@@ -45,23 +46,10 @@ class LastUpdated(commands.Cog):
         await self.update_db()
 
     async def update_db(self):
-        query = """UPDATE players 
-                   SET last_updated = x.last_updated
-                   FROM(
-                       SELECT x.last_updated, x.player_tag
-                       FROM jsonb_to_recordset($1::jsonb)
-                       AS x(
-                           player_tag TEXT,
-                           last_updated TIMESTAMP
-                       )
-                   )
-                   AS x
-                   WHERE players.player_tag = x.player_tag
-                   AND players.season_id = $2
-                """
         async with self.batch_lock:
-            await self.bot.pool.execute(
-                query, list(self.last_updated.values()), await self.bot.seasonconfig.get_season_id()
+            await registry.execute(
+                self.bot.pool, 'last_updated_flush', *to_columns(self.last_updated.values(), *LAST_UPDATED_COLUMNS),
+                self.bot.seasonconfig.season_id
             )
             self.last_updated.clear()
 
@@ -69,7 +57,7 @@ class LastUpdated(commands.Cog):
         async with self.batch_lock:
             self.last_updated[player_tag] = {
                 'player_tag': player_tag,
-                'last_updated': datetime.utcnow().isoformat()
+                'last_updated': datetime.utcnow()
             }
 
     async def on_clan_member_name_change(self, _, __, player, ___):
@@ -159,7 +147,7 @@ class LastUpdated(commands.Cog):
         for n in clan:
             tags.extend(x.tag for x in n.itermembers)
 
-        fetch = await ctx.db.fetch(query, tags, await self.bot.seasonconfig.get_season_id())
+        fetch = await ctx.db.fetch(query, tags, self.bot.seasonconfig.season_id)
 
         if not fetch:
             return await ctx.send(
@@ -190,7 +178,7 @@ class LastUpdated(commands.Cog):
         """
         try:
             async with self.batch_lock:
-                last_updated = datetime.utcnow() - self.last_updated[player.tag]
+                last_updated = self.last_updated[player.tag]['last_updated'] - datetime.utcnow()
         except KeyError:
             query = """SELECT player_tag, 
                               last_updated - now() AS "since" 
@@ -199,7 +187,7 @@ class LastUpdated(commands.Cog):
                        AND season_id = $2
                        ORDER BY since DESC
                     """
-            fetch = await ctx.db.fetchrow(query, player.tag, await self.bot.seasonconfig.get_season_id())
+            fetch = await ctx.db.fetchrow(query, player.tag, self.bot.seasonconfig.season_id)
             if not fetch:
                 return await ctx.send(
                     f"{player} ({player.tag}) was not found in the database. Try `+add player {player.tag}`."
@@ -232,7 +220,7 @@ class LastUpdated(commands.Cog):
                    AND season_id = $2
                    ORDER BY since DESC
                 """
-        fetch = await ctx.db.fetch(query, user.id, await self.bot.seasonconfig.get_season_id())
+        fetch = await ctx.db.fetch(query, user.id, self.bot.seasonconfig.season_id)
         if not fetch:
             return await ctx.send(f"{user} doesn't have any claimed accounts.")
 
@@ -1,165 +1,296 @@
+import asyncio
+import asyncpg
 import datetime
 import logging
+import time
 from dateutil import relativedelta
 
 from discord.ext import commands, tasks
 
+from cogs.utils.statements import (
+    registry, to_columns, SEASON_START_COLUMNS, SEASON_FINAL_COLUMNS, SEASON_SNAPSHOT_COLUMNS
+)
+
 log = logging.getLogger(__name__)
 
+SEASON_PULL_CHUNK_SIZE = 500
+SEASON_PULL_RETRY_DELAY = 30  # seconds, doubled on each failed attempt up to SEASON_PULL_MAX_RETRY_DELAY
+SEASON_PULL_MAX_RETRY_DELAY = 1800
+SEASON_PARTITIONED_TABLES = ('players', 'donationevents', 'trophyevents')
+SEASON_LOAD_ATTEMPTS = 5
+
+
+async def fetch_current_season(pool):
+    """Fetches the current season, retrying transient errors.
+
+    This raises if there's no season or the database can't be reached, rather than let the bot
+    write a season's data under the wrong (or no) season.
+    """
+    query = """SELECT id, start, finish
+               FROM seasons 
+               WHERE start < CURRENT_TIMESTAMP 
+               ORDER BY start DESC
+               LIMIT 1;
+            """
+    for attempt in range(SEASON_LOAD_ATTEMPTS):
+        try:
+            fetch = await pool.fetchrow(query)
+            break
+        except (asyncpg.PostgresConnectionError, OSError):
+            if attempt == SEASON_LOAD_ATTEMPTS - 1:
+                raise
+            log.exception(f'Unable to load the current season (attempt {attempt + 1}), retrying.')
+            await asyncio.sleep(2 ** attempt)
+
+    if not fetch:
+        raise RuntimeError('No season found in the database. The season clock can not be set.')
+    return fetch
+
 
 class SeasonConfig(commands.Cog, command_attrs=dict(hidden=True)):
     def __init__(self, bot):
         self.bot = bot
         self.season_id = 0
+        self.season_start = None
+        self.season_finish = None
+        # the season is loaded before the bot starts (see bot.py), this carries it over a reload of this cog
+        if getattr(bot, 'current_season', None):
+            self.set_season(bot.current_season)
+        self.season_rollover.add_exception_type(asyncpg.PostgresConnectionError)
+        self.season_rollover.start()
+
+    def cog_unload(self):
+        self.season_rollover.cancel()
 
     @staticmethod
-    def next_last_monday():
-        now = datetime.datetime.utcnow()
-        day = now + relativedelta.relativedelta(month=now.month + 1,
-                                                weekday=relativedelta.MO(-1))
-        day.replace(hour=6, minute=0, second=0, microsecond=0)
-        return day
-
-    @tasks.loop(time=datetime.time(hour=6, tzinfo=datetime.timezone.utc))
-    async def start_new_season(self):
-        log.debug('Starting season reset loop.')
-        now = datetime.datetime.utcnow()
-        next_monday = self.next_last_monday()
+    def next_last_monday(now=None):
+        now = now or datetime.datetime.utcnow()
+        for months in (0, 1):
+            day = now + relativedelta.relativedelta(months=months, day=31, weekday=relativedelta.MO(-1),
+                                                    hour=6, minute=0, second=0, microsecond=0)
+            if day > now:
+                return day
 
-        if now.day != next_monday.day:
-            return
+    def set_season(self, record):
+        self.bot.current_season = record
+        self.season_id = record['id']
+        self.season_start = record['start']
+        self.season_finish = record['finish']
+        log.info(f'Season clock set to season {self.season_id}, '
+                 f'finishing at {self.season_finish:%Y-%m-%d %H:%M} (UTC).')
+
+    async def load_season(self):
+        self.set_season(await fetch_current_season(self.bot.pool))
+
+    @tasks.loop()
+    async def season_rollover(self):
+        if not self.season_finish:
+            await asyncio.sleep(3600)
+            return await self.load_season()
+
+        # pick up a rollover that was interrupted by a restart, this is a no-op otherwise
+        await self.new_season_pull()
 
-        log.critical('New season starting - via loop.')
+        delay = (self.season_finish - datetime.datetime.utcnow()).total_seconds()
+        if delay > 0:
+            log.debug(f'Season rollover scheduled in {delay} seconds.')
+            await asyncio.sleep(delay)
+
+        log.critical('New season starting - via season clock.')
         await self.new_season()
         await self.new_season_pull()
 
+    @season_rollover.before_loop
+    async def before_season_rollover(self):
+        if not self.season_id:
+            await self.load_season()
+        if self.season_id:
+            async with self.bot.pool.acquire() as con:
+                await self.create_season_partitions(con, self.season_id)
+        await self.bot.wait_until_ready()
+
+    @staticmethod
+    async def create_season_partitions(con, season_id):
+        """Creates the season's partition of each season table, if it doesn't exist yet.
+
+        Returns False if they couldn't be created. Rows are still written (to the default partition)
+        without them, so this must never stop the season clock.
+        """
+        season_id = int(season_id)
+        try:
+            async with con.transaction():
+                for table in SEASON_PARTITIONED_TABLES:
+                    partition = f'{table}_s{season_id}'
+                    if await con.fetchval("SELECT to_regclass($1)", partition):
+                        continue
+
+                    query = f"SELECT EXISTS (SELECT 1 FROM {table}_default WHERE season_id = $1)"
+                    if not await con.fetchval(query, season_id):
+                        await con.execute(f"CREATE TABLE {partition} PARTITION OF {table} "
+                                          f"FOR VALUES IN ({season_id})")
+                        continue
+
+                    # postgres won't create the partition while the default holds rows for it (eg. rows from
+                    # before the upgrade, see tables.sql), so they're moved across.
+                    # this locks and rescans the default partition, so it's only done when it has to be.
+                    await con.execute(f"ALTER TABLE {table} DETACH PARTITION {table}_default")
+                    await con.execute(f"CREATE TABLE {partition} PARTITION OF {table} FOR VALUES IN ({season_id})")
+                    await con.execute(f"INSERT INTO {partition} SELECT * FROM {table}_default WHERE season_id = $1",
+                                      season_id)
+                    await con.execute(f"DELETE FROM {table}_default WHERE season_id = $1", season_id)
+                    await con.execute(f"ALTER TABLE {table} ATTACH PARTITION {table}_default DEFAULT")
+        except asyncpg.PostgresError:
+            log.exception(f'Unable to create the partitions for season {season_id}. '
+                          f'Its rows will be written to the default partitions.')
+            return False
+        return True
+
     async def new_season(self):
-        query = "INSERT INTO seasons (start, finish) VALUES ($1, $2)"
-        await self.bot.pool.execute(query, datetime.datetime.utcnow(), self.next_last_monday())
-
-        self.season_id = await self.get_season_id(refresh=True)
-
-        query = """INSERT INTO players (
-                            player_tag,
-                            donations,
-                            received,
-                            user_id,
-                            season_id
-                            )
-                    SELECT player_tag,
-                           0,
-                           0,
-                           user_id,
-                           season_id + 1
-                    FROM players
-                    WHERE season_id = $1
-                """
-        await self.bot.pool.execute(query, self.season_id - 1)
+        now = datetime.datetime.utcnow()
+        previous_season_id = self.season_id
+
+        # the new season, its partitions, the players carried forward and the rollover checkpoint are committed
+        # together, so a crash part way through never leaves a season that new_season_pull can't pick up.
+        async with self.bot.pool.acquire() as con:
+            async with con.transaction():
+                query = "INSERT INTO seasons (start, finish) VALUES ($1, $2) RETURNING id, start, finish"
+                fetch = await con.fetchrow(query, now, self.next_last_monday(now))
+                await self.create_season_partitions(con, fetch['id'])
+
+                query = """INSERT INTO players (
+                                    player_tag,
+                                    donations,
+                                    received,
+                                    user_id,
+                                    season_id
+                                    )
+                            SELECT player_tag,
+                                   0,
+                                   0,
+                                   user_id,
+                                   $2
+                            FROM players
+                            WHERE season_id = $1
+                        """
+                await con.execute(query, previous_season_id, fetch['id'])
+                query = "INSERT INTO season_rollovers (season_id, previous_season_id, started) VALUES ($1, $2, $3)"
+                await con.execute(query, fetch['id'], previous_season_id, now)
 
-    async def get_season_id(self, refresh: bool = False):
-        if self.season_id and not refresh:
-            return self.season_id
+        self.set_season(fetch)
 
-        query = "SELECT id FROM seasons WHERE start < CURRENT_TIMESTAMP ORDER BY start DESC;"
-        fetch = await self.bot.pool.fetchrow(query)
-        if not fetch:
+    async def new_season_pull(self):
+        """Pulls start stats for the new season and final stats for the previous one for every player,
+        and freezes the previous season's leaderboards in `season_snapshots`.
+
+        Players are worked through in tag order and each chunk is committed with its checkpoint,
+        so if this is interrupted it carries on from the last committed chunk.
+        Each chunk is retried with a backoff until it goes through, so an API outage or maintenance break
+        only delays the rollover.
+        """
+        season_id = self.season_id
+        query = """SELECT previous_season_id, checkpoint, processed
+                   FROM season_rollovers
+                   WHERE season_id = $1
+                   AND finished IS NULL
+                """
+        rollover = await self.bot.pool.fetchrow(query, season_id)
+        if not rollover:
+            log.info(f'No unfinished rollover found for season {season_id}.')
             return
 
-        self.season_id = fetch[0]
-        return self.season_id
-
-    async def new_season_pull(self, number=1000):
-        query = "SELECT DISTINCT player_tag FROM players WHERE season_id = $1 AND start_update = False LIMIT $2;"
-        fetch = await self.bot.pool.fetch(query, await self.get_season_id(), number)
-
-        query = """UPDATE players SET start_friend_in_need = x.friend_in_need, 
-                                      start_sharing_is_caring = x.sharing_is_caring,
-                                      start_attacks = x.attacks,
-                                      start_defenses = x.defenses,
-                                      start_trophies = x.trophies,
-                                      start_best_trophies = x.best_trophies,
-                                      start_update = True
-                                       
-                    FROM(
-                        SELECT x.player_tag, 
-                               x.friend_in_need, 
-                               x.sharing_is_caring,
-                               x.attacks,
-                               x.defenses,
-                               x.trophies,
-                               x.best_trophies
-                               
-                        FROM jsonb_to_recordset($1::jsonb)
-                        AS x(
-                            player_tag TEXT, 
-                            friend_in_need INTEGER, 
-                            sharing_is_caring INTEGER,
-                            attacks INTEGER,
-                            defenses INTEGER,
-                            trophies INTEGER,
-                            best_trophies INTEGER
-                            )
-                        )
-                AS x
-                WHERE players.player_tag = x.player_tag
-                AND players.season_id=$2
+        previous_season_id = rollover['previous_season_id']
+        checkpoint, processed = rollover['checkpoint'] or '', rollover['processed']
+        log.info(f'Starting season {season_id} rollover pull (final stats for season {previous_season_id}) '
+                 f'from checkpoint {checkpoint!r} ({processed} done).')
+
+        start = time.perf_counter()
+        pulled = 0
+        while True:
+            attempt = 0
+            while True:
+                try:
+                    tags, count = await self.pull_chunk(season_id, previous_season_id, checkpoint)
+                    break
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    delay = min(SEASON_PULL_RETRY_DELAY * 2 ** attempt, SEASON_PULL_MAX_RETRY_DELAY)
+                    attempt += 1
+                    log.exception(f'Season {season_id} rollover chunk after {checkpoint!r} failed '
+                                  f'(attempt {attempt}), retrying in {delay} sec.')
+                    await asyncio.sleep(delay)
+
+            if not tags:
+                break
+
+            checkpoint = tags[-1]
+            pulled += count
+            rate = pulled / (time.perf_counter() - start)
+            log.info(f'Season {season_id} rollover: {processed + pulled} players pulled '
+                     f'({rate:.1f} players/sec), checkpoint {checkpoint}.')
+
+        query = "UPDATE season_rollovers SET finished = $2 WHERE season_id = $1"
+        await self.bot.pool.execute(query, season_id, datetime.datetime.utcnow())
+        log.info(f'Season {season_id} rollover finished. Pulled {pulled} players '
+                 f'in {time.perf_counter() - start:.1f} sec.')
+
+    async def pull_chunk(self, season_id, previous_season_id, checkpoint):
+        """Pulls and commits the next chunk of players after the checkpoint. Returns the tags and players pulled."""
+        query = """SELECT DISTINCT player_tag
+                   FROM players
+                   WHERE season_id = $1
+                   AND start_update = False
+                   AND player_tag > $2
+                   ORDER BY player_tag
+                   LIMIT $3
                 """
-        season_id = await self.get_season_id()
-
-        counter = 0
-        data = []
-        async for player in self.bot.coc.get_players((n[0] for n in fetch)):
-            if counter == 100:
-                # This is basically to ensure we don't have 10k records in memory at any one time.
-                # Safety net incase something fails, too.
-                await self.bot.pool.execute(query, data, season_id)
-                await self.insert_final(self.bot.pool, data, season_id)
-                data.clear()
-                counter = 0
-
-            data.append({
-                'player_tag': player.tag,
-                'friend_in_need': player.achievements_dict['Friend in Need'].value,
-                'sharing_is_caring': player.achievements_dict['Sharing is caring'].value,
-                'attacks': player.attack_wins,
-                'defenses': player.defense_wins,
-                'trophies': player.trophies,
-                'best_trophies': player.best_trophies
-            })
-            counter += 1
+        tags = [n[0] for n in await self.bot.pool.fetch(query, season_id, checkpoint, SEASON_PULL_CHUNK_SIZE)]
+        if not tags:
+            return tags, 0
+
+        players = await self.bot.background.fetch_players(tags)
+        data = [self.bot.background.player_stats(n) for n in players]
+
+        async with self.bot.pool.acquire() as con:
+            async with con.transaction():
+                await registry.execute(con, 'season_start_update',
+                                       *to_columns(data, *SEASON_START_COLUMNS), season_id)
+                await registry.execute(con, 'season_final_update',
+                                       *to_columns(data, *SEASON_FINAL_COLUMNS), previous_season_id)
+                await self.write_snapshot(con, players, previous_season_id)
+                await con.execute("UPDATE season_rollovers SET checkpoint = $2, processed = processed + $3 "
+                                  "WHERE season_id = $1", season_id, tags[-1], len(data))
+        return tags, len(data)
 
     @staticmethod
-    async def insert_final(con, data, season_id):
-        query = """UPDATE players SET end_friend_in_need    = x.friend_in_need, 
-                                      end_sharing_is_caring = x.sharing_is_caring,
-                                      end_attacks           = x.attacks,
-                                      end_defenses          = x.defenses,
-                                      end_best_trophies     = x.best_trophies,
-                                      final_update          = True
-
-                    FROM(
-                        SELECT x.player_tag, 
-                               x.friend_in_need, 
-                               x.sharing_is_caring,
-                               x.attacks,
-                               x.defenses,
-                               x.best_trophies
-                               
-                        FROM jsonb_to_recordset($1::jsonb)
-                        AS x(
-                            player_tag TEXT, 
-                            friend_in_need INTEGER, 
-                            sharing_is_caring INTEGER,
-                            attacks INTEGER,
-                            defenses INTEGER,
-                            best_trophies INTEGER
-                            )
-                        )
-                AS x
-                WHERE players.player_tag = x.player_tag
-                AND players.season_id=$2
+    async def write_snapshot(con, players, season_id):
+        """Freezes the final board rows of these players under the clan they're in now."""
+        data = [{'player_tag': n.tag, 'player_name': n.name, 'clan_tag': n.clan.tag} for n in players if n.clan]
+        await registry.execute(con, 'season_snapshot_insert', *to_columns(data, *SEASON_SNAPSHOT_COLUMNS), season_id)
+
+    async def snapshot_season(self, season_id):
+        """Writes the season snapshot for a season that finished before snapshots were taken at rollover.
+
+        The clans players were in at the end of that season weren't recorded, so this files each player
+        under the clan they're in *now*. Players who have since left every claimed clan are missing from it,
+        and players who moved between claimed clans are shown under their new one.
+        """
+        query = """SELECT DISTINCT player_tag
+                   FROM players
+                   WHERE season_id = $1
+                   AND player_tag > $2
+                   ORDER BY player_tag
+                   LIMIT $3
                 """
-        await con.execute(query, data, season_id - 1)
+        checkpoint = ''
+        while True:
+            tags = [n[0] for n in await self.bot.pool.fetch(query, season_id, checkpoint, SEASON_PULL_CHUNK_SIZE)]
+            if not tags:
+                break
+
+            players = await self.bot.background.fetch_players(tags)
+            await self.write_snapshot(self.bot.pool, players, season_id)
+            checkpoint = tags[-1]
 
     @commands.command()
     @commands.is_owner()
@@ -168,26 +299,73 @@ class SeasonConfig(commands.Cog, command_attrs=dict(hidden=True)):
         if not prompt:
             return
 
-        season_id = await self.get_season_id(refresh=True)
-        if not season_id:
+        await self.load_season()
+        if not self.season_id:
             return await ctx.send('Something strange happened...')
 
-        prompt = await ctx.prompt(f'Current season found: ID {season_id}.\n'
+        prompt = await ctx.prompt(f'Current season found: ID {self.season_id}.\n'
                                   f'Would you like to create a new one anyway?')
 
         if not prompt:
             return
 
         await self.new_season()
-        await self.get_season_id(refresh=True)
+        self.season_rollover.restart()
         await ctx.confirm()
 
     @commands.command()
     @commands.is_owner()
-    async def startingdump(self, ctx, number: int = 1000):
-        await self.new_season_pull(number)
+    async def startingdump(self, ctx):
+        await self.new_season_pull()
         await ctx.confirm()
 
+    @commands.command()
+    @commands.is_owner()
+    async def snapshotseason(self, ctx, season_id: int):
+        """Backfills the frozen leaderboards for a past season, using the clans players are in today.
+
+        This is a best effort for seasons from before snapshots were taken at rollover, see `snapshot_season`.
+        """
+        if season_id >= self.season_id:
+            return await ctx.send('You can only snapshot a past season.')
+
+        exists = await self.bot.pool.fetchval("SELECT 1 FROM season_snapshots WHERE season_id = $1 LIMIT 1", season_id)
+        if exists:
+            return await ctx.send(f'Season {season_id} already has a snapshot.')
+
+        prompt = await ctx.prompt(f'Season {season_id} will be snapshotted with the clans players are in today, '
+                                  f'so players who have left since will be missing. Continue?')
+        if not prompt:
+            return
+
+        await self.snapshot_season(season_id)
+        await ctx.confirm()
+
+    @commands.command()
+    @commands.is_owner()
+    async def detachseason(self, ctx, season_id: int):
+        """Detaches a past season's partitions, so they're no longer scanned or maintained.
+
+        The tables are kept (as `players_s<id>` etc.) and can be archived or dropped separately.
+        """
+        if season_id >= self.season_id:
+            return await ctx.send('You can only detach a past season.')
+
+        query = """SELECT inhrelid::regclass::text
+                   FROM pg_inherits
+                   WHERE inhrelid = ANY(SELECT to_regclass(n) FROM unnest($1::TEXT[]) AS n)
+                """
+        partitions = {f'{n}_s{season_id}': n for n in SEASON_PARTITIONED_TABLES}
+        async with ctx.acquire():
+            attached = {n[0] for n in await ctx.db.fetch(query, list(partitions))}
+            if not attached:
+                return await ctx.send(f'Season {season_id} has no attached partitions.')
+
+            async with ctx.db.transaction():
+                for partition in attached:
+                    await ctx.db.execute(f"ALTER TABLE {partitions[partition]} DETACH PARTITION {partition}")
+        await ctx.send(f'Detached {", ".join(sorted(attached))}.')
+
     async def event_management(self):
         pass  # todo: management for start and end of events
 
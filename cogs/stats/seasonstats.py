@@ -5,7 +5,6 @@ import typing
 
 from discord.ext import commands
 
-from cogs.boards import MockPlayer
 from cogs.utils.db_objects import SlimDummyBoardConfig
 from cogs.utils.paginator import (
     SeasonStatsPaginator, StatsAttacksPaginator, StatsDefensesPaginator, StatsGainsPaginator, StatsDonorsPaginator
@@ -13,14 +12,25 @@ from cogs.utils.paginator import (
 from cogs.utils.formatters import CLYTable, get_render_type
 from cogs.utils.cache import cache, Strategy
 from cogs.utils.emoji_lookup import misc
-
-mock = MockPlayer('Unknown', 'Unknown')
+from cogs.utils.statements import registry, season_snapshot_statement
 
 
 class SeasonStats(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    async def get_season_rows(self, guild_id, season_id, *columns):
+        """Fetches the board rows for a season across the guild's clans, ranked by the first (or given) column."""
+        if season_id >= self.bot.seasonconfig.season_id:
+            # the season isn't over so it has no snapshot yet, rank the clans' current members from their live rows
+            members = [m for clan in await self.bot.get_clans(guild_id) for m in clan.itermembers]
+            return await registry.fetch(self.bot.pool, season_snapshot_statement(*columns, live=True),
+                                        season_id, [n.tag for n in members], [n.name for n in members])
+
+        clans = await registry.fetch(self.bot.pool, 'guild_clans', guild_id)
+        return await registry.fetch(self.bot.pool, season_snapshot_statement(*columns),
+                                    season_id, [n[0] for n in clans])
+
     @cache(strategy=Strategy.lru)
     async def get_board_fmt(self, guild_id, season_id, board_type):
         board_config = await self.bot.utils.get_board_configs(guild_id, board_type)
@@ -29,23 +39,17 @@ class SeasonStats(commands.Cog):
         else:
             board_config = board_config[0]
 
-        clans = await self.bot.get_clans(guild_id)
-
-        players = []
-        for n in clans:
-            players.extend(p for p in n.itermembers)
-
-        top_players = await self.bot.donationboard.get_top_players(
-            players, board_type, board_config.sort_by, False, season_id=season_id
-        )
+        if board_type == 'donation':
+            columns = ('donations', 'received', 'received' if board_config.sort_by == 'received' else 'donations')
+        else:
+            columns = ('trophies', 'gain', 'gain' if board_config.sort_by == 'gain' else 'trophies')
+        top_players = await self.get_season_rows(guild_id, season_id, *columns)
 
         if not top_players:
             e = discord.Embed(colour=self.bot.colour,
                               title='No Data Found.')
             return [e]
 
-        players = {n.tag: n for n in players if n.tag in set(x['player_tag'] for x in top_players)}
-
         message_count = math.ceil(len(top_players) / 20)
 
         embeds = []
@@ -58,12 +62,12 @@ class SeasonStats(commands.Cog):
                 if board_config.render == 2:
                     table.add_row([index,
                                    y[1],
-                                   players.get(y['player_tag'], mock).name])
+                                   y['player_name']])
                 else:
                     table.add_row([index,
                                    y[1],
                                    y[2],
-                                   players.get(y['player_tag'], mock).name])
+                                   y['player_name']])
 
             render = get_render_type(board_config, table)
             fmt = render()
@@ -99,7 +103,7 @@ class SeasonStats(commands.Cog):
         :white_check_mark: `+seasonstats donationboard`
         :white_check_mark: `+seasonstats donationboard 2`
         """
-        embeds = await self.get_board_fmt(ctx.guild.id, season or (await self.bot.seasonconfig.get_season_id()) - 1,
+        embeds = await self.get_board_fmt(ctx.guild.id, season or self.bot.seasonconfig.season_id - 1,
                                           'donation')
         p = SeasonStatsPaginator(ctx, entries=embeds)
         await p.paginate()
@@ -115,7 +119,7 @@ class SeasonStats(commands.Cog):
         :white_check_mark: `+seasonstats trophyboard`
         :white_check_mark: `+seasonstats trophyboard 2`
         """
-        embeds = await self.get_board_fmt(ctx.guild.id, season or (await self.bot.seasonconfig.get_season_id()) - 1,
+        embeds = await self.get_board_fmt(ctx.guild.id, season or self.bot.seasonconfig.season_id - 1,
                                           'trophy')
         p = SeasonStatsPaginator(ctx, entries=embeds)
         await p.paginate()
@@ -131,22 +135,9 @@ class SeasonStats(commands.Cog):
         :white_check_mark: `+season stats attacks`
         :white_check_mark: `+season stats attacks 2`
         """
-        season = season or await self.bot.seasonconfig.get_season_id() - 1
-
-        clans = await ctx.get_clans()
-        query = """SELECT player_tag, ABS(end_attacks - start_attacks) as attacks, trophies 
-               FROM players 
-               WHERE player_tag = ANY($1::TEXT[])
-               AND season_id = $2
-               ORDER BY attacks DESC
-               NULLS LAST
-            """
-
-        players = []
-        for clan in clans:
-            players.extend((n.tag for n in clan.itermembers))
-
-        fetch = await ctx.db.fetch(query, players, season)
+        season = season or self.bot.seasonconfig.season_id - 1
+
+        fetch = await self.get_season_rows(ctx.guild.id, season, 'attacks', 'trophies')
         if not fetch:
             return await ctx.send("No data found. Sorry.")
 
@@ -167,21 +158,8 @@ class SeasonStats(commands.Cog):
         :white_check_mark: `+season stats defenses`
         :white_check_mark: `+season stats defenses 3`
         """
-        season = season or await self.bot.seasonconfig.get_season_id() - 1
-        clans = await ctx.get_clans()
-        query = """SELECT player_tag, end_defenses - start_defenses as defenses, trophies 
-                   FROM players 
-                   WHERE player_tag = ANY($1::TEXT[])
-                   AND season_id = $2
-                   ORDER BY defenses DESC
-                   NULLS LAST
-                """
-
-        players = []
-        for clan in clans:
-            players.extend((n.tag for n in clan.itermembers))
-
-        fetch = await ctx.db.fetch(query, players, season)
+        season = season or self.bot.seasonconfig.season_id - 1
+        fetch = await self.get_season_rows(ctx.guild.id, season, 'defenses', 'trophies')
         if not fetch:
             return await ctx.send("No data found. Sorry.")
 
@@ -203,21 +181,8 @@ class SeasonStats(commands.Cog):
         :white_check_mark: `+season stats gains 1`
         """
 
-        season = season or await self.bot.seasonconfig.get_season_id() - 1
-        clans = await ctx.get_clans()
-        query = """SELECT player_tag, trophies - start_trophies as gain, trophies 
-                   FROM players 
-                   WHERE player_tag = ANY($1::TEXT[])
-                   AND season_id = $2
-                   ORDER BY gain DESC
-                   NULLS LAST
-                """
-
-        players = []
-        for clan in clans:
-            players.extend((n.tag for n in clan.itermembers))
-
-        fetch = await ctx.db.fetch(query, players, season)
+        season = season or self.bot.seasonconfig.season_id - 1
+        fetch = await self.get_season_rows(ctx.guild.id, season, 'gain', 'trophies')
         if not fetch:
             return await ctx.send("No data found. Sorry.")
 
@@ -239,21 +204,8 @@ class SeasonStats(commands.Cog):
         :white_check_mark: `+season stats donations 4`
         """
 
-        season = season or await self.bot.seasonconfig.get_season_id() - 1
-        clans = await ctx.get_clans()
-        query = """SELECT player_tag, (end_friend_in_need + end_sharing_is_caring) - (start_friend_in_need + start_sharing_is_caring) as donations
-                   FROM players 
-                   WHERE player_tag = ANY($1::TEXT[])
-                   AND season_id = $2
-                   ORDER BY donations DESC
-                   NULLS LAST 
-                """
-
-        players = []
-        for clan in clans:
-            players.extend((n.tag for n in clan.itermembers))
-
-        fetch = await ctx.db.fetch(query, players, season)
+        season = season or self.bot.seasonconfig.season_id - 1
+        fetch = await self.get_season_rows(ctx.guild.id, season, 'achievement_donations')
         if not fetch:
             return await ctx.send("No data found. Sorry.")
 
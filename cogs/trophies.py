@@ -92,7 +92,7 @@ class Trophies(commands.Cog):
                     AND season_id=$2
                     ORDER BY trophies DESC
                 """
-        fetch = await ctx.db.fetch(query, user.id, await self.bot.seasonconfig.get_season_id())
+        fetch = await ctx.db.fetch(query, user.id, self.bot.seasonconfig.season_id)
         if not fetch:
             return await ctx.send(f"{'You dont' if ctx.author == user else f'{str(user)} doesnt'} "
                                   f"have any accounts claimed")
@@ -130,7 +130,7 @@ class Trophies(commands.Cog):
                     AND season_id=$2
                     ORDER BY donations DESC
                 """
-        fetch = await ctx.db.fetch(query, player.tag, await self.bot.seasonconfig.get_season_id())
+        fetch = await ctx.db.fetch(query, player.tag, self.bot.seasonconfig.season_id)
 
         if not fetch:
             return await ctx.send(f"{str(player)} ({player.tag}) has not been claimed.")
@@ -173,7 +173,7 @@ class Trophies(commands.Cog):
         for n in clans:
             tags.extend(x.tag for x in n.itermembers)
 
-        fetch = await ctx.db.fetch(query, tags, await self.bot.seasonconfig.get_season_id())
+        fetch = await ctx.db.fetch(query, tags, self.bot.seasonconfig.season_id)
 
         if not fetch:
             return await ctx.send(f"No players claimed for clans "
@@ -41,6 +41,8 @@ import asyncpg
 import logging
 import asyncio
 
+from cogs.utils.statements import registry
+
 log = logging.getLogger(__name__)
 
 class SchemaError(Exception):
@@ -523,6 +525,7 @@ class Table(metaclass=TableMeta):
 
         async def init(con):
             await con.set_type_codec('jsonb', schema='pg_catalog', encoder=_encode_jsonb, decoder=_decode_jsonb, format='text')
+            await registry.prepare_all(con)
             if old_init is not None:
                 await old_init(con)
 
@@ -97,6 +97,25 @@ def format_trophy_log_message(player, clan_name):
     return f"{emoji[0]} {player.name} {emoji[1]} {number} {emojis[player.league_id]} ({clan_name})"
 
 
+def pack_messages(lines, limit=2000):
+    """Greedily join lines into as few messages as fit under Discord's character limit."""
+    messages = []
+    current = ''
+    for line in lines:
+        line = line[:limit]
+        if not current:
+            current = line
+        elif len(current) + len(line) + 1 <= limit:
+            current += '\n' + line
+        else:
+            messages.append(current)
+            current = line
+
+    if current:
+        messages.append(current)
+    return messages
+
+
 class TabularData:
     def __init__(self):
         self._widths = []
@@ -0,0 +1,94 @@
+import logging
+
+from cogs.utils.statements import registry
+from cogs.utils.timer_wheel import TimerWheel
+
+log = logging.getLogger(__name__)
+
+
+class IntervalLogMixin:
+    """Buffers and flushes interval (and digest) logs for a log cog.
+
+    The cog sets ``log_type`` to its ``logs.type`` and implements ``pop_digest_messages(channel_id)``,
+    which pops the channel's digest buffer and returns the formatted lines.
+    """
+    log_type = None
+
+    def start_interval_logs(self):
+        name = type(self).__name__.lower()
+        self._interval_buffers = {}
+        self._digest_buffers = {}
+        self.interval_wheel = TimerWheel(self.flush_interval_channel, loop=self.bot.loop)
+        self.bot.supervisor.spawn(f'{name}.interval_wheel', self.interval_wheel.run, owner=self, restart=True)
+        self.bot.supervisor.spawn(f'{name}.restore_interval_buffers', self.restore_interval_buffers, owner=self)
+
+    def stop_interval_logs(self):
+        # call after cancelling the cog's own tasks.
+        if self._interval_buffers or self._digest_buffers:
+            # only on a reload, `DonationBot.close` spills them on shutdown while the pool is still open.
+            # not owned by the cog so it isn't cancelled with the rest of its tasks
+            name = type(self).__name__.lower()
+            self.bot.supervisor.spawn(f'{name}.spill_interval_buffers', self.spill_interval_buffers)
+
+    async def sync_interval_channels(self):
+        fetch = await registry.fetch(self.bot.pool, 'interval_log_channels', self.log_type)
+        intervals = {n['channel_id']: n['seconds'] for n in fetch}
+
+        for channel_id, seconds in intervals.items():
+            if self.interval_wheel.get_interval(channel_id) != seconds:
+                log.debug(f'Scheduling {self.log_type} interval logs every {seconds} sec '
+                          f'for Channel ID {channel_id}')
+                self.interval_wheel.schedule(channel_id, seconds)
+
+        for channel_id in self.interval_wheel.keys():
+            if channel_id not in intervals:
+                log.debug(f'Interval has been removed from DB. Flushing channel. Channel ID: {channel_id}')
+                self.interval_wheel.remove(channel_id)
+                await self.flush_interval_channel(channel_id)
+
+        log.info(f'Successfully synced {len(intervals)} {self.log_type} interval channels.')
+
+    def schedule_interval_channel(self, config):
+        if config.channel_id not in self.interval_wheel:
+            self.interval_wheel.schedule(config.channel_id, config.seconds)
+
+    def add_interval_messages(self, config, messages):
+        self.schedule_interval_channel(config)
+        self._interval_buffers.setdefault(config.channel_id, []).extend(messages)
+        log.debug(f'Buffered {len(messages)} messages for channel id {config.channel_id}')
+
+    def pop_digest_messages(self, channel_id):
+        raise NotImplementedError
+
+    async def flush_interval_channel(self, channel_id):
+        messages = self._interval_buffers.pop(channel_id, [])
+        messages.extend(self.pop_digest_messages(channel_id))
+        if not messages:
+            return
+
+        self.bot.utils.queue_log_lines(channel_id, self.log_type, messages)
+        log.debug(f'Dispatching {len(messages)} interval logs to channel id {channel_id}')
+
+    async def spill_interval_buffers(self):
+        # keep buffered interval logs across restarts and reloads.
+        for channel_id in list(self._digest_buffers.keys()):
+            self._interval_buffers.setdefault(channel_id, []).extend(self.pop_digest_messages(channel_id))
+
+        buffers, self._interval_buffers = self._interval_buffers, {}
+        to_insert = [(channel_id, fmt) for channel_id, messages in buffers.items() for fmt in messages]
+        if not to_insert:
+            return
+
+        await registry.execute(self.bot.pool, 'tempevents_spill',
+                               [n[0] for n in to_insert], [n[1] for n in to_insert], self.log_type)
+        log.info(f'Spilled {len(to_insert)} {self.log_type} interval logs to the database.')
+
+    async def restore_interval_buffers(self):
+        await self.bot.wait_until_ready()
+
+        fetch = await registry.fetch(self.bot.pool, 'tempevents_restore', self.log_type)
+        for n in fetch:
+            self._interval_buffers.setdefault(n['channel_id'], []).append(n['fmt'])
+
+        log.debug(f'Restored {len(fetch)} {self.log_type} interval logs from the database.')
+        await self.sync_interval_channels()
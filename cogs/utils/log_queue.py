@@ -0,0 +1,128 @@
+import asyncio
+import discord
+import logging
+
+log = logging.getLogger(__name__)
+
+MAX_QUEUE_SIZE = 100
+MAX_RETRIES = 5
+
+
+class LogQueue:
+    """An ordered send queue for a single log channel.
+
+    Messages are delivered one at a time through a webhook owned by the bot, waiting out the rate limit bucket
+    Discord reports in the response headers. If a webhook can't be used the queue falls back to ``channel.send``.
+    """
+    def __init__(self, bot, channel_id, maxsize=MAX_QUEUE_SIZE):
+        self.bot = bot
+        self.channel_id = channel_id
+        self.queue = asyncio.Queue(maxsize=maxsize, loop=bot.loop)
+
+        self.sent = 0
+        self.dropped = 0
+        self.webhook_url = None  # None: not looked up yet, False: unavailable for this channel
+
+        self._remaining = 1
+        self._reset_at = 0.0
+        bot.supervisor.spawn('log_queue.worker', self.worker, owner=self, restart=True)
+
+    def __len__(self):
+        return self.queue.qsize()
+
+    def put(self, content=None, embed=None):
+        try:
+            self.queue.put_nowait((content, embed))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            log.warning(f'Log queue for channel id {self.channel_id} is full, dropped a message.')
+
+    def close(self):
+        self.bot.supervisor.cancel_owner(self)
+
+    async def worker(self):
+        while True:
+            content, embed = await self.queue.get()
+            try:
+                await self.send(content, embed)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.dropped += 1
+                log.exception(f'Failed to send a log to channel id {self.channel_id}')
+
+    async def send(self, content, embed):
+        channel = self.bot.get_channel(self.channel_id)
+        if not channel:
+            self.dropped += 1
+            return
+
+        url = await self.get_webhook_url(channel)
+        if url and await self.send_webhook(url, content, embed):
+            self.sent += 1
+            return
+
+        try:
+            await channel.send(content=content, embed=embed)
+            self.sent += 1
+        except (discord.Forbidden, discord.HTTPException):
+            self.dropped += 1
+
+    async def get_webhook_url(self, channel):
+        if self.webhook_url is not None:
+            return self.webhook_url
+
+        self.webhook_url = False
+        if not channel.permissions_for(channel.guild.me).manage_webhooks:
+            return self.webhook_url
+
+        try:
+            webhooks = await channel.webhooks()
+            webhook = discord.utils.find(lambda w: w.name == self.bot.user.name and w.token, webhooks)
+            if not webhook:
+                webhook = await channel.create_webhook(name=self.bot.user.name, reason='Donation Tracker logs')
+            self.webhook_url = webhook.url
+        except (discord.Forbidden, discord.HTTPException):
+            log.info(f'Unable to use a webhook for channel id {self.channel_id}, falling back to channel.send')
+
+        return self.webhook_url
+
+    async def send_webhook(self, url, content, embed):
+        payload = {
+            'content': content,
+            'username': self.bot.user.name,
+            'avatar_url': str(self.bot.user.avatar_url),
+        }
+        if embed:
+            payload['embeds'] = [embed.to_dict()]
+
+        for _ in range(MAX_RETRIES):
+            if self._remaining == 0:
+                await asyncio.sleep(max(0, self._reset_at - self.bot.loop.time()))
+
+            async with self.bot.session.post(url, json=payload) as resp:
+                self._update_bucket(resp.headers)
+
+                if 200 <= resp.status < 300:
+                    return True
+                if resp.status == 429:
+                    data = await resp.json()
+                    retry_after = resp.headers.get('X-RateLimit-Reset-After') or data['retry_after'] / 1000
+                    log.debug(f'Webhook for channel id {self.channel_id} is rate limited for {retry_after} sec')
+                    await asyncio.sleep(float(retry_after))
+                    continue
+                if resp.status in (401, 404):
+                    # webhook was deleted, look it up again for the next message
+                    self.webhook_url = None
+                return False
+
+        return False
+
+    def _update_bucket(self, headers):
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset_after = headers.get('X-RateLimit-Reset-After')
+        if remaining is None or reset_after is None:
+            return
+
+        self._remaining = int(remaining)
+        self._reset_at = self.bot.loop.time() + float(reset_after)
@@ -3,6 +3,7 @@ import discord
 import inspect
 import textwrap
 
+from collections import namedtuple
 from datetime import datetime
 
 from discord.ext.commands import Paginator as CommandPaginator
@@ -10,6 +11,8 @@ from discord.ext.commands import Paginator as CommandPaginator
 from cogs.utils.emoji_lookup import misc
 from cogs.utils.formatters import CLYTable, get_render_type, events_time, readable_time
 
+SnapshotPlayer = namedtuple('SnapshotPlayer', 'tag name')
+
 
 class CannotPaginate(Exception):
     pass
@@ -388,6 +391,16 @@ class TablePaginator(Pages):
         render = get_render_type(self.ctx.config, self.table)
         return render()
 
+    async def get_players(self, data):
+        # rows from a season snapshot carry the player's name, so there's no need to ask the API for it
+        if all('player_name' in n[1].keys() for n in data):
+            for n in data:
+                yield SnapshotPlayer(n[1]['player_tag'], n[1]['player_name'])
+            return
+
+        async for player in self.bot.coc.get_players([n[1]['player_tag'] for n in data]):
+            yield player
+
     async def get_embed(self, entries, page, *, first=False):
         if self.maximum_pages > 1:
             if self.show_entry_count:
@@ -497,11 +510,27 @@ class TrophyPaginator(TablePaginator):
 
 
 class LogsPaginator(TablePaginator):
-    def __init__(self, ctx, data, title, page_count=1, rows_per_table=20):
-        super().__init__(ctx, data, title=title, page_count=page_count,
+    def __init__(self, ctx, data=None, title=None, page_count=1, rows_per_table=20, fetch=None, total=None):
+        super().__init__(ctx, data or [], title=title, page_count=page_count,
                          rows_per_table=rows_per_table)
+        # fetch(last_row, count) loads the next `count` rows after `last_row` when pages are requested.
+        self.fetch = fetch
+        self.total = total
+
+    async def load_rows(self, count):
+        if self.total is not None:
+            count = min(count, self.total)
+
+        needed = count - len(self.data)
+        if not self.fetch or needed <= 0:
+            return
+
+        last_row = self.data[-1][1] if self.data else None
+        rows = await self.fetch(last_row, needed)
+        self.data.extend(enumerate(rows, start=len(self.data)))
 
     async def prepare_entry(self, page):
+        await self.load_rows(page * self.rows_per_table)
         self.table.clear_rows()
         base = (page - 1) * self.rows_per_table
         data = self.data[base:base + self.rows_per_table]
@@ -551,8 +580,7 @@ class StatsAttacksPaginator(TablePaginator):
         data = self.data[base:base + self.rows_per_table]
         data_by_tag = {n[1]['player_tag']: n for n in data}
 
-        tags = [n[1]['player_tag'] for n in data]
-        async for player in self.bot.coc.get_players(tags):
+        async for player in self.get_players(data):
             self.create_row(player, data_by_tag)
 
         return self.table.trophyboard_attacks() + self.key
@@ -575,8 +603,7 @@ class StatsDefensesPaginator(TablePaginator):
         data = self.data[base:base + self.rows_per_table]
         data_by_tag = {n[1]['player_tag']: n for n in data}
 
-        tags = [n[1]['player_tag'] for n in data]
-        async for player in self.bot.coc.get_players(tags):
+        async for player in self.get_players(data):
             self.create_row(player, data_by_tag)
 
         return self.table.trophyboard_defenses() + self.key
@@ -599,8 +626,7 @@ class StatsGainsPaginator(TablePaginator):
         data = self.data[base:base + self.rows_per_table]
         data_by_tag = {n[1]['player_tag']: n for n in data}
 
-        tags = [n[1]['player_tag'] for n in data]
-        async for player in self.bot.coc.get_players(tags):
+        async for player in self.get_players(data):
             self.create_row(player, data_by_tag)
 
         return self.table.trophyboard_gain() + self.key
@@ -615,7 +641,7 @@ class StatsDonorsPaginator(TablePaginator):
 
     def create_row(self, player, data):
         player_data = data[player.tag]
-        self.table.add_row([player_data[0], player_data[1]['donations'], player.name])
+        self.table.add_row([player_data[0], player_data[1][1], player.name])
 
     async def prepare_entry(self, page):
         self.table.clear_rows()
@@ -623,8 +649,7 @@ class StatsDonorsPaginator(TablePaginator):
         data = self.data[base:base + self.rows_per_table]
         data_by_tag = {n[1]['player_tag']: n for n in data}
 
-        tags = [n[1]['player_tag'] for n in data]
-        async for player in self.bot.coc.get_players(tags):
+        async for player in self.get_players(data):
             self.create_row(player, data_by_tag)
 
         return self.table.donationboard_2() + self.key
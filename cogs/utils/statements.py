@@ -0,0 +1,555 @@
+import asyncpg
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+
+class StatementStats:
+    __slots__ = ('calls', 'total_time', 'max_time')
+
+    def __init__(self):
+        self.calls = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def add(self, elapsed):
+        self.calls += 1
+        self.total_time += elapsed
+        if elapsed > self.max_time:
+            self.max_time = elapsed
+
+    @property
+    def average_time(self):
+        return self.total_time / self.calls if self.calls else 0.0
+
+
+class StatementRegistry:
+    """A registry of named queries that are prepared once per connection.
+
+    Every connection in the pool prepares all registered statements in the pool's
+    ``init``. Statements registered after a connection was created, or that failed
+    to prepare then, are prepared lazily the first time they are used on that connection.
+    """
+    def __init__(self):
+        self.queries = {}
+        self.stats = {}
+        self._prepared = {}
+
+    def register(self, name, query):
+        if self.queries.get(name, query) != query:
+            raise ValueError(f'A different statement has already been registered as {name}.')
+
+        self.queries[name] = query
+        self.stats.setdefault(name, StatementStats())
+        return name
+
+    def _connection_statements(self, con):
+        try:
+            return self._prepared[con]
+        except KeyError:
+            # prepared statements keep their connection alive, so they're dropped when it goes away.
+            con.add_termination_listener(self._on_connection_termination)
+            prepared = self._prepared[con] = {}
+            return prepared
+
+    def _on_connection_termination(self, con):
+        self._prepared.pop(con, None)
+
+    async def prepare_all(self, con):
+        prepared = self._connection_statements(con)
+        for name, query in self.queries.items():
+            try:
+                prepared[name] = await con.prepare(query)
+            except asyncpg.PostgresError as exc:
+                # eg. a column that hasn't been migrated yet. Don't take the connection down with it,
+                # the statement is prepared again (and raises) when it's first used.
+                log.warning('Unable to prepare statement %s: %r', name, exc)
+        log.debug('Prepared %s statements for connection %s.', len(prepared), con)
+
+    async def get_statement(self, con, name):
+        # pool connections are proxies - we want to key by the underlying connection.
+        con = getattr(con, '_con', con)
+        prepared = self._connection_statements(con)
+        try:
+            return prepared[name]
+        except KeyError:
+            statement = prepared[name] = await con.prepare(self.queries[name])
+            return statement
+
+    async def _run(self, con, name, method, args):
+        if isinstance(con, asyncpg.pool.Pool):
+            async with con.acquire() as connection:
+                return await self._run(connection, name, method, args)
+
+        start = time.perf_counter()
+        statement = await self.get_statement(con, name)
+        try:
+            result = await getattr(statement, method)(*args)
+        except asyncpg.InvalidCachedStatementError:
+            # the schema changed underneath us, re-prepare and try once more.
+            self._prepared.get(getattr(con, '_con', con), {}).pop(name, None)
+            statement = await self.get_statement(con, name)
+            result = await getattr(statement, method)(*args)
+
+        self.stats[name].add((time.perf_counter() - start) * 1000)
+        return statement, result
+
+    async def fetch(self, con, name, *args):
+        _, result = await self._run(con, name, 'fetch', args)
+        return result
+
+    async def fetchrow(self, con, name, *args):
+        _, result = await self._run(con, name, 'fetchrow', args)
+        return result
+
+    async def fetchval(self, con, name, *args):
+        _, result = await self._run(con, name, 'fetchval', args)
+        return result
+
+    async def execute(self, con, name, *args):
+        statement, _ = await self._run(con, name, 'fetch', args)
+        return statement.get_statusmsg()
+
+
+registry = StatementRegistry()
+
+
+def to_columns(rows, *keys):
+    """Splits a list of row dicts into one list per key, for use with ``unnest($1::TYPE[], ...)``."""
+    return [[row[key] for row in rows] for key in keys]
+
+
+# configs
+registry.register('log_config', """SELECT guild_id, 
+                                         channel_id, 
+                                         "interval", 
+                                         toggle,
+                                         type,
+                                         digest
+                                  FROM logs 
+                                  WHERE channel_id=$1 
+                                  AND type=$2
+                               """)
+registry.register('board_config', """SELECT guild_id, 
+                                           channel_id,
+                                           icon_url,
+                                           title,
+                                           render,
+                                           sort_by,
+                                           toggle,
+                                           type,
+                                           in_event
+                                    FROM boards 
+                                    WHERE channel_id = $1
+                                 """)
+registry.register('board_channels', """SELECT channel_id 
+                                      FROM boards 
+                                      WHERE guild_id = $1 
+                                      AND type = $2 
+                                      AND toggle = True;
+                                   """)
+
+# clan lookups
+registry.register('clan_name', "SELECT clan_name FROM clans WHERE clan_tag=$1 AND guild_id=$2")
+registry.register('all_clan_names', "SELECT DISTINCT guild_id, clan_tag, clan_name FROM clans")
+registry.register('guild_clans', "SELECT DISTINCT clan_tag FROM clans WHERE guild_id = $1")
+registry.register('guild_clans_in_event', "SELECT DISTINCT clan_tag FROM clans WHERE guild_id = $1 AND in_event = $2")
+registry.register('channel_clans', "SELECT DISTINCT clan_tag FROM clans WHERE channel_id = $1")
+registry.register('channel_clans_in_event', "SELECT DISTINCT clan_tag FROM clans WHERE channel_id=$1 AND in_event=$2")
+registry.register('board_channels_for_clans', """SELECT DISTINCT boards.channel_id
+                                                FROM boards
+                                                INNER JOIN clans
+                                                ON clans.channel_id = boards.channel_id
+                                                WHERE clans.clan_tag = ANY($1::TEXT[])
+                                             """)
+
+# boards
+registry.register('global_top_players', """SELECT player_tag, donations
+                                          FROM players 
+                                          WHERE season_id=$1
+                                          ORDER BY donations DESC NULLS LAST
+                                          LIMIT 100;
+                                       """)
+
+
+def top_players_statement(board_type, sort_by, in_event):
+    """Registers (if needed) and returns the name of the board query for the given board settings."""
+    if board_type == 'donation':
+        column_1 = 'donations'
+        column_2 = 'received'
+        sort_by = key = 'donations' if sort_by == 'donation' else sort_by
+    elif board_type == 'trophy':
+        column_1 = 'trophies'
+        column_2 = 'trophies - start_trophies'
+        key = 'gain' if sort_by == 'gain' else 'trophies'
+        sort_by = column_2 if sort_by == 'gain' else column_1
+    else:
+        return None
+
+    # this should be ok since columns can only be a choice of 4 defined names
+    if in_event:
+        name = f'event_top_players:{board_type}:{key}'
+        query = f"""SELECT player_tag, {column_1}, {column_2} 
+                    FROM eventplayers 
+                    WHERE player_tag=ANY($1::TEXT[])
+                    AND live=true
+                    ORDER BY {sort_by} DESC NULLS LAST 
+                    LIMIT 100;
+                """
+    else:
+        name = f'season_top_players:{board_type}:{key}'
+        query = f"""SELECT player_tag, {column_1}, {column_2}
+                    FROM players 
+                    WHERE player_tag=ANY($1::TEXT[])
+                    AND season_id=$2
+                    ORDER BY {sort_by} DESC NULLS LAST
+                    LIMIT 100;
+                """
+    return registry.register(name, query)
+
+
+for _board_type, _sort_by in (('donation', 'donations'), ('donation', 'received'),
+                              ('trophy', 'trophies'), ('trophy', 'gain')):
+    top_players_statement(_board_type, _sort_by, True)
+    top_players_statement(_board_type, _sort_by, False)
+
+
+# columns a season board can show, and how each is worked out from a (live) players row.
+# see `season_snapshots` in tables.sql for the frozen copies.
+SNAPSHOT_COLUMNS = {
+    'donations': 'donations',
+    'received': 'received',
+    'trophies': 'trophies',
+    'gain': 'trophies - start_trophies',
+    'attacks': 'ABS(end_attacks - start_attacks)',
+    'defenses': 'end_defenses - start_defenses',
+    'achievement_donations': '(end_friend_in_need + end_sharing_is_caring) '
+                             '- (start_friend_in_need + start_sharing_is_caring)',
+}
+
+
+def season_snapshot_statement(column_1, column_2=None, sort_by=None, live=False):
+    """Registers (if needed) and returns the name of the query for a season board.
+
+    Finished seasons read the frozen rows in `season_snapshots`. With ``live``, the rows are worked out from
+    `players` for the given members instead, since a season in progress has no snapshot yet.
+    """
+    sort_by = sort_by or column_1
+    if any(n not in SNAPSHOT_COLUMNS for n in (column_1, column_2 or column_1, sort_by)):
+        return None
+
+    columns = [n for n in (column_1, column_2) if n]
+    if live:
+        name = f'season_live:{", ".join(columns)}:{sort_by}'
+        query = f"""SELECT players.player_tag, {', '.join(f'{SNAPSHOT_COLUMNS[n]} AS {n}' for n in columns)},
+                           x.player_name
+                    FROM players
+                    INNER JOIN unnest($2::TEXT[], $3::TEXT[]) AS x(player_tag, player_name)
+                    ON players.player_tag = x.player_tag
+                    WHERE players.season_id=$1
+                    ORDER BY {sort_by} DESC NULLS LAST
+                 """
+    else:
+        name = f'season_snapshot:{", ".join(columns)}:{sort_by}'
+        query = f"""SELECT player_tag, {', '.join(columns)}, player_name
+                    FROM season_snapshots
+                    WHERE season_id=$1
+                    AND clan_tag=ANY($2::TEXT[])
+                    ORDER BY {sort_by} DESC NULLS LAST
+                 """
+    return registry.register(name, query)
+
+
+for _columns in (('donations', 'received', 'donations'), ('donations', 'received', 'received'),
+                 ('trophies', 'gain', 'trophies'), ('trophies', 'gain', 'gain'),
+                 ('attacks', 'trophies'), ('defenses', 'trophies'), ('gain', 'trophies'),
+                 ('achievement_donations', )):
+    season_snapshot_statement(*_columns)
+    season_snapshot_statement(*_columns, live=True)
+
+# bulk inserts - these take typed parallel arrays, see `to_columns`.
+FLUSH_COLUMNS = ('player_tag', 'donations', 'received', 'trophies')
+DONATION_EVENT_COLUMNS = ('player_tag', 'player_name', 'clan_tag', 'donations', 'received', 'time', 'season_id')
+TROPHY_EVENT_COLUMNS = ('player_tag', 'player_name', 'clan_tag', 'trophy_change', 'league_id', 'time', 'season_id')
+LAST_UPDATED_COLUMNS = ('player_tag', 'last_updated')
+EVENT_PLAYER_COLUMNS = ('player_tag', 'trophies', 'end_fin', 'end_sic', 'end_attacks', 'end_defenses',
+                        'end_best_trophies')
+SEASON_START_COLUMNS = ('player_tag', 'friend_in_need', 'sharing_is_caring', 'attacks', 'defenses', 'trophies',
+                        'best_trophies')
+JOIN_PLAYER_COLUMNS = ('player_tag', 'donations', 'received', 'trophies', 'friend_in_need', 'sharing_is_caring',
+                       'attacks', 'defenses', 'best_trophies')
+EVENT_JOIN_COLUMNS = ('player_tag', 'event_id', 'friend_in_need', 'sharing_is_caring', 'attacks', 'defenses',
+                      'trophies', 'best_trophies')
+COMMAND_COLUMNS = ('guild_id', 'channel_id', 'author_id', 'used', 'prefix', 'command', 'failed', 'latency')
+SEASON_FINAL_COLUMNS = ('player_tag', 'friend_in_need', 'sharing_is_caring', 'attacks', 'defenses', 'best_trophies')
+SEASON_SNAPSHOT_COLUMNS = ('player_tag', 'player_name', 'clan_tag')
+
+# a single statement (and so a single round-trip and transaction) for everything collected in a board tick.
+# $1-$5 are the player deltas and season, $6-$12 donation events and $13-$19 trophy events.
+registry.register('tick_flush', """WITH players_update AS (
+                                      UPDATE players SET donations         = players.donations + x.donations, 
+                                                         received          = players.received  + x.received, 
+                                                         trophies          = x.trophies
+                                      FROM unnest($1::TEXT[], $2::INTEGER[], $3::INTEGER[], $4::INTEGER[])
+                                      AS x(player_tag, donations, received, trophies)
+                                      WHERE players.player_tag = x.player_tag
+                                      AND players.season_id=$5
+                                      RETURNING 1
+                                  ),
+                                  eventplayers_update AS (
+                                      UPDATE eventplayers SET donations         = eventplayers.donations + x.donations, 
+                                                              received          = eventplayers.received  + x.received,
+                                                              trophies          = x.trophies
+                                      FROM unnest($1::TEXT[], $2::INTEGER[], $3::INTEGER[], $4::INTEGER[])
+                                      AS x(player_tag, donations, received, trophies)
+                                      WHERE eventplayers.player_tag = x.player_tag
+                                      AND eventplayers.live = true
+                                      RETURNING 1
+                                  ),
+                                  donationevents_insert AS (
+                                      INSERT INTO donationevents (player_tag, player_name, clan_tag, 
+                                                                  donations, received, time, season_id)
+                                      SELECT x.player_tag, x.player_name, x.clan_tag, 
+                                             x.donations, x.received, x.time, x.season_id
+                                      FROM unnest($6::TEXT[], $7::TEXT[], $8::TEXT[], $9::INTEGER[], 
+                                                  $10::INTEGER[], $11::TIMESTAMP[], $12::INTEGER[])
+                                      AS x(player_tag, player_name, clan_tag, 
+                                           donations, received, time, season_id)
+                                      RETURNING 1
+                                  ),
+                                  trophyevents_insert AS (
+                                      INSERT INTO trophyevents (player_tag, player_name, clan_tag, 
+                                                                trophy_change, league_id, time, season_id)
+                                      SELECT x.player_tag, x.player_name, x.clan_tag, 
+                                             x.trophy_change, x.league_id, x.time, x.season_id
+                                      FROM unnest($13::TEXT[], $14::TEXT[], $15::TEXT[], $16::INTEGER[], 
+                                                  $17::INTEGER[], $18::TIMESTAMP[], $19::INTEGER[])
+                                      AS x(player_tag, player_name, clan_tag, 
+                                           trophy_change, league_id, time, season_id)
+                                      RETURNING 1
+                                  )
+                                  SELECT (SELECT COUNT(*) FROM players_update) AS players,
+                                         (SELECT COUNT(*) FROM eventplayers_update) AS eventplayers,
+                                         (SELECT COUNT(*) FROM donationevents_insert) AS donationevents,
+                                         (SELECT COUNT(*) FROM trophyevents_insert) AS trophyevents
+                               """)
+registry.register('donationevents_insert', """INSERT INTO donationevents (player_tag, player_name, clan_tag, 
+                                                                        donations, received, time, season_id)
+                                                 SELECT x.player_tag, x.player_name, x.clan_tag, 
+                                                        x.donations, x.received, x.time, x.season_id
+                                                 FROM unnest($1::TEXT[], $2::TEXT[], $3::TEXT[], $4::INTEGER[], 
+                                                             $5::INTEGER[], $6::TIMESTAMP[], $7::INTEGER[])
+                                                 AS x(player_tag, player_name, clan_tag, 
+                                                      donations, received, time, season_id)
+                                          """)
+registry.register('trophyevents_insert', """INSERT INTO trophyevents (player_tag, player_name, clan_tag, 
+                                                                    trophy_change, league_id, time, season_id)
+                                               SELECT x.player_tag, x.player_name, x.clan_tag, 
+                                                      x.trophy_change, x.league_id, x.time, x.season_id
+                                               FROM unnest($1::TEXT[], $2::TEXT[], $3::TEXT[], $4::INTEGER[], 
+                                                           $5::INTEGER[], $6::TIMESTAMP[], $7::INTEGER[])
+                                               AS x(player_tag, player_name, clan_tag, 
+                                                    trophy_change, league_id, time, season_id)
+                                        """)
+registry.register('last_updated_flush', """UPDATE players 
+                                          SET last_updated = x.last_updated
+                                          FROM unnest($1::TEXT[], $2::TIMESTAMP[]) AS x(player_tag, last_updated)
+                                          WHERE players.player_tag = x.player_tag
+                                          AND players.season_id = $3
+                                       """)
+registry.register('event_players_update', """UPDATE eventplayers
+                                            SET donations             = x.end_fin + x.end_sic 
+                                                                        - eventplayers.start_friend_in_need 
+                                                                        - eventplayers.start_sharing_is_caring,
+                                                trophies              = x.trophies,
+                                                end_friend_in_need    = x.end_fin,
+                                                end_sharing_is_caring = x.end_sic,
+                                                end_attacks           = x.end_attacks,
+                                                end_defenses          = x.end_defenses,
+                                                end_best_trophies     = x.end_best_trophies
+                                            FROM unnest($1::TEXT[], $2::INTEGER[], $3::INTEGER[], $4::INTEGER[], 
+                                                        $5::INTEGER[], $6::INTEGER[], $7::INTEGER[])
+                                            AS x(player_tag, trophies, end_fin, end_sic, 
+                                                 end_attacks, end_defenses, end_best_trophies)
+                                            WHERE eventplayers.player_tag = x.player_tag
+                                            AND eventplayers.live = True
+                                         """)
+registry.register('event_players_enroll', """INSERT INTO eventplayers (player_tag,
+                                                                   trophies,
+                                                                   event_id,
+                                                                   start_friend_in_need,
+                                                                   start_sharing_is_caring,
+                                                                   start_attacks,
+                                                                   start_defenses,
+                                                                   start_trophies,
+                                                                   start_best_trophies,
+                                                                   start_update,
+                                                                   live)
+                                            SELECT x.player_tag, x.trophies, $8, x.friend_in_need,
+                                                   x.sharing_is_caring, x.attacks, x.defenses, x.trophies,
+                                                   x.best_trophies, True, True
+                                            FROM unnest($1::TEXT[], $2::INTEGER[], $3::INTEGER[], $4::INTEGER[],
+                                                        $5::INTEGER[], $6::INTEGER[], $7::INTEGER[])
+                                            AS x(player_tag, friend_in_need, sharing_is_caring,
+                                                 attacks, defenses, trophies, best_trophies)
+                                            ON CONFLICT (player_tag, event_id)
+                                            DO NOTHING
+                                         """)
+registry.register('players_join_insert', """INSERT INTO players (player_tag,
+                                                              donations,
+                                                              received,
+                                                              trophies,
+                                                              start_trophies,
+                                                              season_id,
+                                                              start_friend_in_need,
+                                                              start_sharing_is_caring,
+                                                              start_attacks,
+                                                              start_defenses,
+                                                              start_best_trophies,
+                                                              start_update)
+                                           SELECT x.player_tag, x.donations, x.received, x.trophies, x.trophies, $10,
+                                                  x.friend_in_need, x.sharing_is_caring, x.attacks, x.defenses,
+                                                  x.best_trophies, True
+                                           FROM unnest($1::TEXT[], $2::INTEGER[], $3::INTEGER[], $4::INTEGER[],
+                                                       $5::INTEGER[], $6::INTEGER[], $7::INTEGER[], $8::INTEGER[],
+                                                       $9::INTEGER[])
+                                           AS x(player_tag, donations, received, trophies, friend_in_need,
+                                                sharing_is_caring, attacks, defenses, best_trophies)
+                                           ON CONFLICT (player_tag, season_id)
+                                           DO NOTHING
+                                        """)
+registry.register('event_players_join', """INSERT INTO eventplayers (player_tag,
+                                                                 trophies,
+                                                                 event_id,
+                                                                 start_friend_in_need,
+                                                                 start_sharing_is_caring,
+                                                                 start_attacks,
+                                                                 start_defenses,
+                                                                 start_trophies,
+                                                                 start_best_trophies,
+                                                                 start_update,
+                                                                 live)
+                                          SELECT x.player_tag, x.trophies, x.event_id, x.friend_in_need,
+                                                 x.sharing_is_caring, x.attacks, x.defenses, x.trophies,
+                                                 x.best_trophies, True, True
+                                          FROM unnest($1::TEXT[], $2::INTEGER[], $3::INTEGER[], $4::INTEGER[],
+                                                      $5::INTEGER[], $6::INTEGER[], $7::INTEGER[], $8::INTEGER[])
+                                          AS x(player_tag, event_id, friend_in_need, sharing_is_caring,
+                                               attacks, defenses, trophies, best_trophies)
+                                          ON CONFLICT (player_tag, event_id)
+                                          DO UPDATE SET live = True
+                                       """)
+registry.register('event_players_finalise', """UPDATE eventplayers SET end_friend_in_need    = x.friend_in_need,
+                                                                end_sharing_is_caring = x.sharing_is_caring,
+                                                                end_attacks           = x.attacks,
+                                                                end_defenses          = x.defenses,
+                                                                end_best_trophies     = x.best_trophies,
+                                                                live                  = False,
+                                                                final_update          = True
+                                              FROM unnest($1::TEXT[], $2::INTEGER[], $3::INTEGER[],
+                                                          $4::INTEGER[], $5::INTEGER[], $6::INTEGER[])
+                                              AS x(player_tag, friend_in_need, sharing_is_caring,
+                                                   attacks, defenses, best_trophies)
+                                              WHERE eventplayers.player_tag = x.player_tag
+                                              AND eventplayers.event_id = $7
+                                           """)
+# players the API no longer finds (eg. banned) keep the last stats the event updater saw.
+registry.register('event_players_finalise_missing', """UPDATE eventplayers SET live = False, final_update = True
+                                                      WHERE player_tag = ANY($1::TEXT[])
+                                                      AND event_id = $2
+                                                   """)
+registry.register('season_start_update', """UPDATE players SET start_friend_in_need    = x.friend_in_need, 
+                                                             start_sharing_is_caring = x.sharing_is_caring,
+                                                             start_attacks           = x.attacks,
+                                                             start_defenses          = x.defenses,
+                                                             start_trophies          = x.trophies,
+                                                             start_best_trophies     = x.best_trophies,
+                                                             start_update            = True
+                                           FROM unnest($1::TEXT[], $2::INTEGER[], $3::INTEGER[], $4::INTEGER[], 
+                                                       $5::INTEGER[], $6::INTEGER[], $7::INTEGER[])
+                                           AS x(player_tag, friend_in_need, sharing_is_caring, 
+                                                attacks, defenses, trophies, best_trophies)
+                                           WHERE players.player_tag = x.player_tag
+                                           AND players.season_id=$8
+                                        """)
+registry.register('season_final_update', """UPDATE players SET end_friend_in_need    = x.friend_in_need, 
+                                                             end_sharing_is_caring = x.sharing_is_caring,
+                                                             end_attacks           = x.attacks,
+                                                             end_defenses          = x.defenses,
+                                                             end_best_trophies     = x.best_trophies,
+                                                             final_update          = True
+                                           FROM unnest($1::TEXT[], $2::INTEGER[], $3::INTEGER[], 
+                                                       $4::INTEGER[], $5::INTEGER[], $6::INTEGER[])
+                                           AS x(player_tag, friend_in_need, sharing_is_caring, 
+                                                attacks, defenses, best_trophies)
+                                           WHERE players.player_tag = x.player_tag
+                                           AND players.season_id=$7
+                                        """)
+registry.register('season_snapshot_insert', """INSERT INTO season_snapshots (season_id, clan_tag, player_tag, player_name,
+                                                                          donations, received, trophies, gain,
+                                                                          attacks, defenses, achievement_donations)
+                                              SELECT players.season_id, x.clan_tag, x.player_tag, x.player_name,
+                                                     players.donations, players.received, players.trophies,
+                                                     players.trophies - players.start_trophies,
+                                                     ABS(players.end_attacks - players.start_attacks),
+                                                     players.end_defenses - players.start_defenses,
+                                                     (players.end_friend_in_need + players.end_sharing_is_caring)
+                                                     - (players.start_friend_in_need + players.start_sharing_is_caring)
+                                              FROM unnest($1::TEXT[], $2::TEXT[], $3::TEXT[])
+                                              AS x(player_tag, player_name, clan_tag)
+                                              INNER JOIN players
+                                              ON players.player_tag = x.player_tag
+                                              AND players.season_id = $4
+                                              WHERE EXISTS (SELECT 1 FROM clans WHERE clans.clan_tag = x.clan_tag)
+                                              ON CONFLICT (season_id, player_tag) DO NOTHING
+                                           """)
+
+# logs
+registry.register('log_clan_channels', """SELECT DISTINCT clans.clan_tag, clans.channel_id
+                                         FROM clans
+                                         INNER JOIN logs
+                                         ON logs.channel_id = clans.channel_id
+                                         WHERE logs.type = $1
+                                      """)
+registry.register('interval_log_channels', """SELECT channel_id, EXTRACT(EPOCH FROM interval)::FLOAT8 AS seconds
+                                             FROM logs
+                                             WHERE toggle = True
+                                             AND interval > make_interval()
+                                             AND type = $1
+                                          """)
+registry.register('tempevents_spill', """INSERT INTO tempevents (channel_id, fmt, type)
+                                        SELECT x.channel_id, x.fmt, $3
+                                        FROM unnest($1::BIGINT[], $2::TEXT[])
+                                        AS x(channel_id, fmt)
+                                     """)
+registry.register('tempevents_restore', """DELETE FROM tempevents
+                                          WHERE type = $1
+                                          RETURNING channel_id, fmt
+                                       """)
+registry.register('log_cursor', "SELECT reported_to FROM log_cursors WHERE type = $1")
+registry.register('log_cursor_update', """INSERT INTO log_cursors (type, reported_to)
+                                         VALUES ($1, $2)
+                                         ON CONFLICT (type)
+                                         DO UPDATE SET reported_to = $2
+                                      """)
+registry.register('donationevents_since', """SELECT player_tag, player_name, clan_tag, donations, received, time, season_id
+                                            FROM donationevents
+                                            WHERE time > $1
+                                            ORDER BY time
+                                         """)
+registry.register('trophyevents_since', """SELECT player_tag, player_name, clan_tag, trophy_change, league_id, time, season_id
+                                          FROM trophyevents
+                                          WHERE time > $1
+                                          ORDER BY time
+                                       """)
+
+# analytics
+registry.register('commands_insert', """INSERT INTO commands (guild_id, channel_id, author_id, used,
+                                                             prefix, command, failed, latency)
+                                       SELECT x.guild_id, x.channel_id, x.author_id, x.used,
+                                              x.prefix, x.command, x.failed, x.latency
+                                       FROM unnest($1::BIGINT[], $2::BIGINT[], $3::BIGINT[], $4::TIMESTAMP[],
+                                                   $5::TEXT[], $6::TEXT[], $7::BOOLEAN[], $8::REAL[])
+                                       AS x(guild_id, channel_id, author_id, used, prefix, command, failed, latency)
+                                    """)
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+
+from collections import defaultdict
+
+log = logging.getLogger(__name__)
+
+
+class TaskStats:
+    __slots__ = ('started', 'running', 'restarts', 'exceptions', 'last_exception')
+
+    def __init__(self):
+        self.started = 0
+        self.running = 0
+        self.restarts = 0
+        self.exceptions = 0
+        self.last_exception = None
+
+
+class SupervisedTask:
+    __slots__ = ('name', 'factory', 'owner', 'restart', 'max_restarts', 'restarts', 'task', 'handle')
+
+    def __init__(self, name, factory, owner, restart, max_restarts):
+        self.name = name
+        self.factory = factory
+        self.owner = owner
+        self.restart = restart
+        self.max_restarts = max_restarts
+        self.restarts = 0
+        self.task = None
+        self.handle = None  # pending restart
+
+    def cancel(self):
+        if self.handle:
+            self.handle.cancel()
+        if self.task:
+            self.task.cancel()
+
+
+class TaskSupervisor:
+    """Owns every background task the bot spawns outside of ``tasks.loop``.
+
+    Tasks are spawned from a zero argument callable so they can be restarted after an exception,
+    and are grouped by owner (usually a cog) so they can all be cancelled when it unloads.
+    """
+    def __init__(self, loop):
+        self.loop = loop
+        self.stats = defaultdict(TaskStats)
+        self._entries = {}
+
+        self.lag = 0.0
+        self.max_lag = 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def spawn(self, name, factory, *, owner=None, restart=False, max_restarts=5):
+        entry = SupervisedTask(name, factory, owner, restart, max_restarts)
+        self._start(entry)
+        return entry.task
+
+    def _start(self, entry):
+        self._entries.pop(entry.task, None)
+        entry.handle = None
+        entry.task = self.loop.create_task(entry.factory())
+        entry.task.add_done_callback(self._on_done)
+        self._entries[entry.task] = entry
+
+        stats = self.stats[entry.name]
+        stats.started += 1
+        stats.running += 1
+
+    def _on_done(self, task):
+        entry = self._entries.pop(task)
+        stats = self.stats[entry.name]
+        stats.running -= 1
+
+        if task.cancelled():
+            return
+
+        exc = task.exception()
+        if exc is None:
+            return
+
+        stats.exceptions += 1
+        stats.last_exception = repr(exc)
+        log.error(f'Supervised task {entry.name} raised an exception', exc_info=exc)
+
+        if not entry.restart or entry.restarts >= entry.max_restarts:
+            return
+
+        entry.restarts += 1
+        stats.restarts += 1
+        delay = min(2 ** entry.restarts, 60)
+        log.info(f'Restarting supervised task {entry.name} in {delay} sec (attempt {entry.restarts})')
+
+        entry.handle = self.loop.call_later(delay, self._start, entry)
+        self._entries[task] = entry  # keep it cancellable while it waits to restart
+
+    def _cancel(self, entries):
+        for entry in entries:
+            entry.cancel()
+            if entry.handle:
+                # it was waiting to restart, so there's no running task left to clean it up
+                self._entries.pop(entry.task, None)
+        return len(entries)
+
+    def cancel_owner(self, owner):
+        return self._cancel([n for n in self._entries.values() if n.owner is owner])
+
+    def cancel_all(self):
+        return self._cancel(list(self._entries.values()))
+
+    async def monitor_lag(self, interval=1.0):
+        while True:
+            start = self.loop.time()
+            await asyncio.sleep(interval)
+            self.lag = self.loop.time() - start - interval
+            self.max_lag = max(self.max_lag, self.lag)
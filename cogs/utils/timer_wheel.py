@@ -0,0 +1,80 @@
+import asyncio
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class TimerWheel:
+    """A hashed timer wheel that calls ``callback(key)`` every ``interval`` seconds for each scheduled key.
+
+    Every key shares the single task running :meth:`run`,
+    so the cost of the wheel does not grow with the number of keys.
+    Intervals longer than one revolution of the wheel are tracked with a round counter.
+    """
+    def __init__(self, callback, *, tick=1.0, size=3600, loop=None):
+        self.callback = callback
+        self.tick = tick
+        self.size = size
+        self.loop = loop or asyncio.get_event_loop()
+
+        self._slots = [{} for _ in range(size)]  # key: rounds left before it fires
+        self._intervals = {}
+        self._positions = {}
+        self._cursor = 0
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def __contains__(self, key):
+        return key in self._intervals
+
+    def get_interval(self, key):
+        return self._intervals.get(key)
+
+    def schedule(self, key, seconds):
+        self.remove(key)
+        self._intervals[key] = seconds
+        self._insert(key, seconds)
+
+    def remove(self, key):
+        self._intervals.pop(key, None)
+        slot = self._positions.pop(key, None)
+        if slot is not None:
+            self._slots[slot].pop(key, None)
+
+    def keys(self):
+        return list(self._intervals.keys())
+
+    def _insert(self, key, seconds):
+        ticks = max(1, round(seconds / self.tick))
+        slot = (self._cursor + ticks) % self.size
+        self._slots[slot][key] = (ticks - 1) // self.size
+        self._positions[key] = slot
+
+    def _advance(self):
+        self._cursor = (self._cursor + 1) % self.size
+        slot = self._slots[self._cursor]
+
+        due = [k for k, rounds in slot.items() if rounds == 0]
+        for key, rounds in slot.items():
+            if rounds:
+                slot[key] = rounds - 1
+
+        for key in due:
+            del slot[key]
+            self._insert(key, self._intervals[key])
+        return due
+
+    async def run(self):
+        next_tick = self.loop.time()
+        while True:
+            next_tick += self.tick
+            await asyncio.sleep(max(0, next_tick - self.loop.time()))
+
+            for key in self._advance():
+                try:
+                    await self.callback(key)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    log.exception(f'Timer wheel callback failed for key {key}')
@@ -1,5 +1,5 @@
 CREATE TABLE players (
-    id serial PRIMARY KEY,
+    id serial,
 
     player_tag TEXT,
     donations INTEGER,
@@ -20,8 +20,10 @@ CREATE TABLE players (
     end_defenses integer default 0,
     start_best_trophies integer default 0,
     end_best_trophies integer default 0,
-    last_updated timestamp default now()
-    );
+    last_updated timestamp default now(),
+    PRIMARY KEY (id, season_id)
+    ) PARTITION BY LIST (season_id);
+create table players_default partition of players default;
 create index player_tag_idx on players (player_tag);
 create index user_id_idx on players (user_id);
 create index season_idx on players (season_id);
@@ -61,7 +63,8 @@ CREATE TABLE logs (
     channel_id bigint,
     interval interval DEFAULT (0 ||' minutes')::interval,
     toggle boolean,
-    type text
+    type text,
+    digest boolean default false
 );
 
 create table clans (
@@ -122,13 +125,30 @@ CREATE TABLE commands (
     used TIMESTAMP,
     prefix TEXT,
     command TEXT,
-    failed BOOLEAN
+    failed BOOLEAN,
+    latency REAL
 );
 create index author_id_idx on commands (author_id);
 create index guild_id_idx on commands (guild_id);
 
+-- players, donationevents and trophyevents are partitioned by season.
+-- partitions are created at season rollover (see `SeasonConfig.create_season_partitions`)
+--
+-- upgrading an existing database, with the bot stopped and for each of the three tables (players shown):
+-- begin;
+-- alter table players rename to players_old;
+-- drop index player_tag_idx, user_id_idx, season_idx;  -- the old table's index names are reused below
+-- <the create table, default partition and index statements for players above>
+-- insert into players (id, player_tag, donations, received, start_trophies, trophies, user_id, season_id, ...)
+--     select id, player_tag, donations, received, start_trophies, trophies, user_id, season_id, ...
+--     from players_old;  -- every column of the new table, by name
+-- select setval(pg_get_serial_sequence('players', 'id'), (select max(id) from players));
+-- drop table players_old;
+-- commit;
+-- the old rows all land in the default partition. On startup the current season's rows are moved into
+-- their own partition, past seasons can be left where they are.
 CREATE TABLE donationevents (
-    id serial PRIMARY KEY,
+    id serial,
 
     player_tag TEXT,
     player_name TEXT,
@@ -136,27 +156,38 @@ CREATE TABLE donationevents (
     donations INTEGER,
     received INTEGER,
     time TIMESTAMP,
-    reported BOOLEAN DEFAULT False,
-    season_id integer
-);
+    season_id integer,
+    PRIMARY KEY (id, season_id)
+) PARTITION BY LIST (season_id);
+create table donationevents_default partition of donationevents default;
 
 create table trophyevents (
-    id serial primary key,
+    id serial,
     player_tag text,
     player_name text,
     clan_tag text,
     trophy_change integer,
     league_id integer default 29000000,
     time timestamp,
-    reported boolean default false,
-    season_id integer
-);
+    season_id integer,
+    primary key (id, season_id)
+) partition by list (season_id);
+create table trophyevents_default partition of trophyevents default;
 
-create index player_tag_idx on donationevents (player_tag);
-create index clan_tag_idx on donationevents (clan_tag);
-create index reported_idx on donationevents (reported);
+create index donationevents_player_tag_time_idx on donationevents (player_tag, time DESC, id DESC);
+create index donationevents_clan_tag_time_idx on donationevents (clan_tag, time DESC, id DESC);
+create index donationevents_time_idx on donationevents (time DESC, id DESC);
 create index season_id_idx on donationevents (season_id);
 
+create index trophyevents_player_tag_time_idx on trophyevents (player_tag, time DESC, id DESC);
+create index trophyevents_clan_tag_time_idx on trophyevents (clan_tag, time DESC, id DESC);
+create index trophyevents_time_idx on trophyevents (time DESC, id DESC);
+
+create table log_cursors (
+    type text primary key,
+    reported_to timestamp
+);
+
 create table tempevents (
     id serial primary key,
     channel_id bigint,
@@ -172,6 +203,31 @@ CREATE TABLE seasons (
 );
 create index start_idx on seasons (start);
 
+CREATE TABLE season_rollovers (
+    season_id integer primary key,
+    previous_season_id integer,
+    started timestamp,
+    finished timestamp,
+    checkpoint text,
+    processed integer default 0
+);
+
+CREATE TABLE season_snapshots (
+    season_id integer,
+    clan_tag text,
+    player_tag text,
+    player_name text,
+    donations integer,
+    received integer,
+    trophies integer,
+    gain integer,
+    attacks integer,
+    defenses integer,
+    achievement_donations integer,
+    PRIMARY KEY (season_id, player_tag)
+);
+create index season_snapshots_clan_idx on season_snapshots (season_id, clan_tag);
+
 create table events (
     id serial primary key,
     start timestamp,
@@ -180,10 +236,15 @@ create table events (
     guild_id bigint,
     channel_id bigint,
     start_report boolean default false,
+    finish_report boolean default false,
     donation_msg bigint default 0,
     trophy_msg bigint default 0
 )
 
+-- upgrading an existing database, events that have already finished must not be reported again:
+-- alter table events add column finish_report boolean default false;
+-- update events set finish_report = true where finish < now();
+
 CREATE OR REPLACE FUNCTION public.get_event_id(guild_id bigint)
  RETURNS integer
  LANGUAGE plpgsql
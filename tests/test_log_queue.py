@@ -0,0 +1,30 @@
+import asyncio
+import types
+
+import pytest
+
+pytest.importorskip('discord')
+
+from cogs.botutils import Utils
+from cogs.utils.supervisor import TaskSupervisor
+
+
+def test_channel_reuses_its_log_queue():
+    loop = asyncio.new_event_loop()
+    try:
+        bot = types.SimpleNamespace(loop=loop, supervisor=TaskSupervisor(loop))
+        utils = types.SimpleNamespace(bot=bot, log_queues={})
+
+        first = Utils.get_log_queue(utils, 1234)
+        first.put(content='first')
+        second = Utils.get_log_queue(utils, 1234)
+        second.put(content='second')
+
+        assert first is second
+        assert len(first) == 2
+        assert len(bot.supervisor) == 1
+        assert bot.supervisor.stats['log_queue.worker'].started == 1
+    finally:
+        bot.supervisor.cancel_all()
+        loop.run_until_complete(asyncio.sleep(0))
+        loop.close()